@@ -1,10 +1,13 @@
 """Main service class that handles all AI agent interactions."""
 
 import json
+import time
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 import google.generativeai as genai
 
+from metrics import record_llm_call
+
 from .agent_types import (
     SafetyStatus,
     LearningState,
@@ -55,7 +58,8 @@ class AgentService:
     def __init__(self, api_key: str):
         """Initialize the agent service with API key."""
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
+        self.model_name = 'gemini-pro'
+        self.model = genai.GenerativeModel(self.model_name)
         self.learning_state = self._initialize_learning_state()
 
     def _initialize_learning_state(self) -> LearningState:
@@ -89,11 +93,20 @@ class AgentService:
             feedback=answer_eval.feedback
         )
 
+    @staticmethod
+    def _agent_name(input_data: Any) -> str:
+        """Metrics label for an agent input type, e.g. QuestionAgentInput -> question."""
+        if isinstance(input_data, dict):
+            return 'unknown'
+        return type(input_data).__name__.replace('Agent', '').replace('Input', '').lower() or 'unknown'
+
     def _call_agent(self, instructions: str, input_data: Any) -> Any:
         """Handle communication with the AI model."""
         print('\n=== Agent Call ===')
         print('Instructions:', instructions.split('\n')[0])
         print('Input:', json.dumps(getattr(input_data, "to_dict", lambda: input_data)(), indent=2))
+        agent = self._agent_name(input_data)
+        started = time.perf_counter()
 
         try:
             chat = self.model.start_chat(history=[
@@ -114,6 +127,7 @@ class AgentService:
             }))
 
             response = result.text
+            record_llm_call('gemini', self.model_name, agent, 'ok', started)
             print('Raw response:', response)
 
             try:
@@ -165,6 +179,7 @@ class AgentService:
 
         except Exception as e:
             print(f'Error in agent call: {e}')
+            record_llm_call('gemini', self.model_name, agent, 'blocked' if 'SAFETY' in str(e) else 'error', started)
             if 'SAFETY' in str(e):
                 return {
                     'status': SafetyStatus.INAPPROPRIATE,
@@ -1,209 +1,64 @@
 import os
 import json
-import requests
-from dotenv import load_dotenv
-from flask import Flask, request, send_file, jsonify
+from flask import Blueprint, Flask, Response, g, request, send_file, jsonify
 from flask_cors import CORS
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader
-from werkzeug.utils import secure_filename
-import kokoro
-from kokoro import KPipeline
 import soundfile as sf
 import numpy as np
-import re
-import pdfplumber
-import torch
 import io
-from typing import List
-from agents import AgentService, SafetyStatus
+import base64
+from speech import (FORMAT_ALIASES, WHISPER_SAMPLE_RATE, AudiobookError, ModelServerError, available_audio_formats,
+                    TranscriptionRejected, decode_mono, iter_encoded_stream, paginate_text, split_sections)
+from jobs import FINISHED_STATES, JobWorkerPool
+from ingestion import ChunkedUploadStore, UploadError
+from retrieval import BM25Index
 import time
-from datetime import datetime, timedelta
-from openai import OpenAI
-import whisper
-
-load_dotenv()
-
-api_key = os.getenv("GEMINI_API_KEY")
-github_token = os.getenv("GITHUB_TOKEN")
-
-pipeline = KPipeline(lang_code='a')
-
-app = Flask(__name__)
-
-client = OpenAI(
-    base_url="https://models.github.ai/inference",
-    api_key=github_token,
-) if github_token else None
-
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-
-class RateLimitedGeminiAPI:
-    def __init__(self, api_key, model="gemini-1.5-pro-latest"):
-        self.api_key = api_key
-        self.last_request_time = None
-        self.min_interval = 1
-        self.retry_attempts = 2
-        self.base_delay = 0.5
-        self.model = model
-        
-    def call_gemini_api(self, prompt, model_override=None):
-        if not self.api_key:
-            return None
-        if not self.api_key.startswith('AIzaSy'):
-            return None
-        if self.last_request_time:
-            time_since_last = time.time() - self.last_request_time
-            if time_since_last < self.min_interval:
-                sleep_time = self.min_interval - time_since_last
-                time.sleep(sleep_time)
-        url = (
-            f"https://generativelanguage.googleapis.com/v1beta/models/"
-            f"{model_override or self.model}:generateContent?key={self.api_key}"
-        )
-        headers = {"Content-Type": "application/json"}
-        data = {
-            "contents": [
-                {
-                    "parts": [
-                        {"text": prompt}
-                    ]
-                }
-            ]
-        }
-        for attempt in range(self.retry_attempts):
-            try:
-                self.last_request_time = time.time()
-                response = requests.post(url, headers=headers, json=data, timeout=15)
-                if response.status_code == 200:
-                    return response.json()["candidates"][0]["content"]["parts"][0]["text"]
-                elif response.status_code == 429:
-                    if attempt < self.retry_attempts - 1:
-                        time.sleep(self.base_delay * (2 ** attempt))
-                        continue
-                    else:
-                        return None
-                else:
-                    response.raise_for_status()
-            except Exception:
-                if attempt < self.retry_attempts - 1:
-                    time.sleep(self.base_delay * (2 ** attempt))
-                    continue
-                return None
-        return None
-
-gemini_api = RateLimitedGeminiAPI(GEMINI_API_KEY, model="gemini-1.5-pro-latest")
-gemini_flash_api = RateLimitedGeminiAPI(GEMINI_API_KEY, model="gemini-1.5-flash")
-
-def call_gemini_api(prompt, use_github_api=True, model_override=None):
-    if use_github_api and client and github_token:
-        try:
-            response = client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a helpful AI assistant that creates educational content and answers questions. Always include at least one diagram or visual explanation in the output.",
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt,
-                    }
-                ],
-                model="openai/gpt-4o",
-                temperature=0.8,
-                max_tokens=1800,
-                top_p=1
-            )
-            return response.choices[0].message.content
-        except Exception:
-            pass
-    api = gemini_flash_api if model_override == "flash" else gemini_api
-    return api.call_gemini_api(prompt, model_override="gemini-1.5-flash" if model_override == "flash" else None)
-
-def build_prompt_with_heading_and_diagram(title, content, icon="📘"):
-    return (
-        f"## {icon} {title}\n"
-        "Please answer in the following format:\n"
-        "- Start with a large, bold markdown heading (##) and a relevant icon for the topic.\n"
-        "- Add a diagram (as a Markdown image, ASCII, or a creative visual analogy) and provide a caption. If you can't generate an image, use ASCII or a creative analogy in markdown.\n"
-        "- Structure your explanation as concise bullet points (not paragraphs).\n"
-        "- Always include the diagram and the points, even if you must invent a visual analogy.\n\n"
-        f"Content to answer: {content}\n"
-    )
+from subsystems import SubsystemDisabled, parse_subsystem_list
+import metrics
+from profiling import init_profiling
+from metrics import HTTP_REQUEST_SECONDS, JOB_QUEUE_DEPTH, LIVE_STREAMS, STT_QUEUE_DEPTH
+from services import (CACHE_DIR, audiobook_store, build_prompt_with_heading_and_diagram, call_gemini_api,
+                      iter_audio_segments, job_handlers, job_store, model_server, run_content_pipeline, services)
 
-def process_with_gemini(text, use_github_api=True):
-    summary_title = "AI Answer"
-    prompt = build_prompt_with_heading_and_diagram(summary_title, text, "📘")
-    result = call_gemini_api(prompt, use_github_api=use_github_api, model_override="flash")
-    if result is None:
-        return gemini_flash_api.call_gemini_api(prompt, model_override="gemini-1.5-flash")
-    return result
+bp = Blueprint('mindflow', __name__)
 
 chat_history = []
 vector_store = None
-CORS(app, resources={r"/*": {"origins": ["http://localhost:3000"], "methods": ["GET", "POST"], "allow_headers": ["Content-Type"]}})
-agent_service = AgentService(api_key=GEMINI_API_KEY)
 
-DOWNLOADS_DIR = "downloads"
-UPLOAD_FOLDER = "uploads"
-os.makedirs(DOWNLOADS_DIR, exist_ok=True)
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
-def download_file(file_url):
-    try:
-        if file_url.endswith('.pdf'):
-            filename = file_url.split("/")[-1]
-        else:
-            filename = file_url.split("/")[-2] + ".pdf"
-        local_filename = os.path.join(DOWNLOADS_DIR, filename)
-        response = requests.get(file_url, stream=True, timeout=30)
-        response.raise_for_status()
-        with open(local_filename, "wb") as file:
-            for chunk in response.iter_content(chunk_size=8192):
-                file.write(chunk)
-        return local_filename
-    except requests.exceptions.RequestException:
-        return None
-    except Exception:
-        return None
-
-def extract_text_from_pdf(pdf_path):
-    try:
-        try:
-            loader = PyPDFLoader(pdf_path)
-            pages = loader.load()
-            text = "\n".join([page.page_content for page in pages if page.page_content])
-            if text.strip():
-                return text
-        except Exception:
-            pass
-        try:
-            import pdfplumber
-            with pdfplumber.open(pdf_path) as pdf:
-                text_parts = []
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_parts.append(page_text)
-                if text_parts:
-                    text = "\n".join(text_parts)
-                    text = re.sub(r"(\w+)\s*\n\s*(\w+)", r"\1 \2", text)
-                    return text
-        except Exception:
-            pass
-        return ""
-    except Exception:
-        return ""
+upload_store = ChunkedUploadStore(
+    os.path.join(CACHE_DIR, "uploads"),
+    max_chunk_size=int(os.getenv("UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+)
 
 def split_text_for_rag(text):
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
     text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
     return text_splitter.split_text(text)
 
-@app.route('/test-github-api', methods=['POST'])
+EXPLAIN_CONTEXT_CHARS = int(os.getenv("EXPLAIN_CONTEXT_CHARS", "12000"))
+
+def relevant_context(text, query, max_chars=EXPLAIN_CONTEXT_CHARS):
+    """Return ``text``, or when it is longer than ``max_chars`` the RAG chunks
+    that best match ``query`` (in document order) up to that size."""
+    if len(text) <= max_chars or not query:
+        return text
+    chunks = split_text_for_rag(text)
+    index = BM25Index.from_chunks(chunks)
+    picked, size = [], 0
+    for doc_id, _ in index.search(query, k=len(chunks)):
+        if size + len(chunks[doc_id]) > max_chars:
+            break
+        picked.append(doc_id)
+        size += len(chunks[doc_id])
+    if not picked:
+        return text[:max_chars]
+    return "\n\n".join(chunks[doc_id] for doc_id in sorted(picked))
+
+@bp.route('/test-github-api', methods=['POST'])
 def test_github_api():
     try:
         data = request.json
         prompt = data.get('prompt', 'What is the capital of France?')
+        client = services.openai_client
         if not client:
             return jsonify({
                 'error': 'GitHub API not configured. Please set GITHUB_TOKEN environment variable.'
@@ -234,7 +89,7 @@ def test_github_api():
             'error': str(e)
         }), 500
 
-@app.route('/process-interaction', methods=['POST'])
+@bp.route('/process-interaction', methods=['POST'])
 def process_interaction():
     try:
         data = request.json
@@ -246,7 +101,7 @@ def process_interaction():
         current_topic = data.get('current_topic')
         active_subtopic = data.get('active_subtopic')
         session_history = data.get('session_history')
-        response = agent_service.start_new_topic(user_input, current_topic=current_topic, active_subtopic=active_subtopic, session_history=session_history)
+        response = services.agent_service.start_new_topic(user_input, current_topic=current_topic, active_subtopic=active_subtopic, session_history=session_history)
         response_dict = response.to_dict()
         return jsonify(response_dict)
     except Exception as e:
@@ -255,7 +110,7 @@ def process_interaction():
         }), 500
 
 def generate_audio(text):
-    generator = pipeline(
+    generator = services.pipeline(
         text, voice='af_heart',
         speed=1
     )
@@ -265,138 +120,145 @@ def generate_audio(text):
     final_audio = np.concatenate(all_audio)
     return final_audio
 
-@app.route("/process-text2speech", methods=["POST"])
+def wants_streaming():
+    value = request.args.get("stream") or request.form.get("stream") or ""
+    return value.lower() in ("1", "true", "yes")
+
+AUDIO_OUTPUT_FORMATS = available_audio_formats()
+
+def negotiate_audio_format():
+    """Pick the output format from ?format=/form field, else the Accept header.
+
+    Returns None when an explicitly requested format can't be produced.
+    """
+    requested = (request.args.get("format") or request.form.get("format") or "").strip().lower()
+    if requested:
+        requested = FORMAT_ALIASES.get(requested, requested)
+        return requested if requested in AUDIO_OUTPUT_FORMATS else None
+    by_mimetype = {audio_format.mimetype: name for name, audio_format in AUDIO_OUTPUT_FORMATS.items()}
+    best = request.accept_mimetypes.best_match(list(by_mimetype), default="audio/wav")
+    return by_mimetype[best]
+
+@bp.route("/process-text2speech", methods=["POST"])
 def process_text2speech():
+    services.require('tts')
     text = ""
     if "pdf" in request.files:
         file = request.files["pdf"]
         if file.filename == "":
             return jsonify({"error": "No selected file"}), 400
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(file_path)
         try:
-            with pdfplumber.open(file_path) as pdf:
-                text_parts = []
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_parts.append(page_text)
-                text = " ".join(text_parts)
-            text = re.sub(r"(\w+)\s*\n\s*(\w+)", r"\1 \2", text)
-            try:
-                os.remove(file_path)
-            except Exception:
-                pass
+            text = " ".join(services.pdf_pages(file.stream))
         except Exception as e:
-            try:
-                os.remove(file_path)
-            except:
-                pass
             return jsonify({"error": f"Could not extract text from PDF: {str(e)}"}), 400
+    elif request.form.get("upload_id"):
+        upload_id = request.form["upload_id"]
+        try:
+            with upload_store.open(upload_id, kind="pdf") as f:
+                text = " ".join(services.pdf_pages(f))
+        except UploadError:
+            raise
+        except Exception as e:
+            return jsonify({"error": f"Could not extract text from PDF: {str(e)}"}), 400
+        upload_store.delete(upload_id)
     else:
         text = request.form.get("text", "").strip()
     if not text:
         return jsonify({"error": "No text provided"}), 400
+    audio_format = negotiate_audio_format()
+    if audio_format is None:
+        return jsonify({
+            "error": "Unsupported audio format",
+            "supported_formats": sorted(AUDIO_OUTPUT_FORMATS)
+        }), 406
+    mimetype = AUDIO_OUTPUT_FORMATS[audio_format].mimetype
+    if wants_streaming():
+        return Response(
+            iter_encoded_stream(iter_audio_segments(text), services.pipeline.sample_rate, audio_format),
+            mimetype=mimetype,
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no', 'Vary': 'Accept'},
+            direct_passthrough=True
+        )
     try:
         audio = generate_audio(text)
-        wav_file = io.BytesIO()
-        sf.write(wav_file, audio, 24000, format='WAV')
-        wav_file.seek(0)
-        return send_file(wav_file, mimetype='audio/wav', as_attachment=False)
+        audio_file = io.BytesIO()
+        if audio_format == "wav":
+            sf.write(audio_file, audio, services.pipeline.sample_rate, format='WAV')
+        else:
+            for data in iter_encoded_stream([audio], services.pipeline.sample_rate, audio_format):
+                audio_file.write(data)
+        audio_file.seek(0)
+        response = send_file(audio_file, mimetype=mimetype, as_attachment=False)
+        response.headers['Vary'] = 'Accept'
+        return response
     except Exception as e:
         return jsonify({"error": f"Could not generate audio: {str(e)}"}), 500
 
-def is_valid_pdf(file_url):
-    try:
-        if any(domain in file_url.lower() for domain in ['ucarecdn.com', 'drive.google.com', 'dropbox.com']):
-            return True
-        if file_url.lower().endswith('.pdf'):
-            return True
-        response = requests.head(file_url, timeout=10, allow_redirects=True)
-        response.raise_for_status()
-        content_type = response.headers.get('content-type', '').lower()
-        if 'application/pdf' in content_type:
-            return True
-        response = requests.get(file_url, stream=True, timeout=10)
-        response.raise_for_status()
-        first_chunk = next(response.iter_content(chunk_size=4), b'')
-        is_pdf = first_chunk.startswith(b'%PDF')
-        return is_pdf
-    except Exception:
-        return True
-
-@app.route("/", methods=["GET"])
+@bp.app_errorhandler(UploadError)
+def handle_upload_error(e):
+    return jsonify({'error': str(e), **e.details}), e.status
+
+@bp.route('/uploads', methods=['POST'])
+def create_upload():
+    data = request.json or {}
+    upload = upload_store.create(
+        filename=data.get('filename', ''),
+        size=data.get('size'),
+        kind=data.get('kind', 'pdf'),
+        checksum=data.get('sha256')
+    )
+    return jsonify(upload), 201
+
+@bp.route('/uploads/<upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    return jsonify(upload_store.status(upload_id))
+
+@bp.route('/uploads/<upload_id>/chunks', methods=['POST'])
+def upload_chunk(upload_id):
+    offset = request.headers.get('Upload-Offset', '')
+    if not offset.isdigit():
+        return jsonify({'error': 'Upload-Offset header is required'}), 400
+    upload = upload_store.write_chunk(
+        upload_id,
+        offset=int(offset),
+        stream=request.stream,
+        length=request.content_length or 0,
+        checksum=request.headers.get('X-Chunk-Sha256', '')
+    )
+    return jsonify(upload)
+
+@bp.route('/uploads/<upload_id>/complete', methods=['POST'])
+def complete_upload(upload_id):
+    return jsonify(upload_store.complete(upload_id))
+
+@bp.route("/", methods=["GET"])
 def home():
     return jsonify({"status": "MindFlow backend is running 🚀"})
 
-@app.route('/process-content', methods=['POST'])
-def process_content():
-    try:
-        data = request.json
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
-        notes = data.get('notes', '')
-        files = data.get('files', [])
-        if not files and not notes.strip():
-            return jsonify({
-                'error': 'No files or notes provided. Please upload PDF files or add notes.',
-                'debug_info': {
-                    'received_files': files,
-                    'received_notes_length': len(notes) if notes else 0
-                }
-            }), 400
-        all_text = []
-        if notes and notes.strip():
-            all_text.append(notes.strip())
-        if files and len(files) > 0:
-            for i, file_url in enumerate(files):
-                if not file_url or not file_url.strip():
-                    continue
-                file_url = file_url.strip()
-                local_file = download_file(file_url)
-                if not local_file:
-                    return jsonify({
-                        'error': f'Could not download file {i+1}. Please check the URL: {file_url}'
-                    }), 400
-                try:
-                    text = extract_text_from_pdf(local_file)
-                    if text and text.strip():
-                        all_text.append(text.strip())
-                except Exception as e:
-                    return jsonify({
-                        'error': f'Could not extract text from PDF {i+1}: {str(e)}'
-                    }), 400
-                finally:
-                    try:
-                        if local_file and os.path.exists(local_file):
-                            os.remove(local_file)
-                    except Exception:
-                        pass
-        if not all_text:
-            return jsonify({
-                'error': 'No content to process. Please provide PDF files with readable text or add notes.',
-                'debug_info': {
-                    'files_received': len(files),
-                    'notes_length': len(notes) if notes else 0,
-                    'text_extracted': len(all_text)
-                }
-            }), 400
-        combined_text = "\n\n".join(all_text)
-        processed_content = process_with_gemini(combined_text)
-        if not processed_content:
-            return jsonify({
-                'error': 'AI processing failed. Please try again.'
-            }), 503
+def validate_content_request(data):
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+    notes = data.get('notes', '')
+    files = data.get('files', [])
+    if not files and not notes.strip():
         return jsonify({
-            'response': processed_content,
-            'status': 'success',
+            'error': 'No files or notes provided. Please upload PDF files or add notes.',
             'debug_info': {
-                'content_length': len(combined_text),
-                'files_processed': len(files),
-                'had_notes': bool(notes and notes.strip())
+                'received_files': files,
+                'received_notes_length': len(notes) if notes else 0
             }
-        })
+        }), 400
+    return None
+
+@bp.route('/process-content', methods=['POST'])
+def process_content():
+    try:
+        data = request.json
+        invalid = validate_content_request(data)
+        if invalid:
+            return invalid
+        body, status = run_content_pipeline(data.get('notes', ''), data.get('files', []))
+        return jsonify(body), status
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -405,43 +267,388 @@ def process_content():
             'technical_error': str(e)
         }), 500
 
-@app.route("/get-summary", methods=["GET"])
+# Each event stream holds a worker thread, so streams are closed after this
+# many seconds; EventSource clients reconnect on their own and get the
+# current state straight away.
+JOB_EVENTS_TIMEOUT = float(os.getenv("JOB_EVENTS_TIMEOUT", "600"))
+
+def job_to_response(job):
+    return {
+        'job_id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'progress': job['progress'],
+        'result': job['result'],
+        'error': job['error'],
+        'attempts': job['attempts'],
+        'created_at': job['created_at'],
+        'updated_at': job['updated_at']
+    }
+
+@bp.route('/jobs/process-content', methods=['POST'])
+def submit_process_content_job():
+    data = request.json
+    invalid = validate_content_request(data)
+    if invalid:
+        return invalid
+    job_id = job_store.submit('process-content', {
+        'notes': data.get('notes', ''),
+        'files': data.get('files', [])
+    })
+    return jsonify({
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': f'/jobs/{job_id}',
+        'events_url': f'/jobs/{job_id}/events'
+    }), 202
+
+@bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found or expired'}), 404
+    return jsonify(job_to_response(job))
+
+@bp.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    if not job_store.cancel(job_id):
+        return jsonify({'error': 'Job not found or already finished'}), 404
+    return jsonify(job_to_response(job_store.get(job_id)))
+
+@bp.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    def stream():
+        last_seen = None
+        last_sent = time.time()
+        deadline = last_sent + JOB_EVENTS_TIMEOUT
+        while time.time() < deadline:
+            job = job_store.get(job_id)
+            if job is None:
+                yield f"event: error\ndata: {json.dumps({'error': 'Job not found or expired'})}\n\n"
+                return
+            if (job['status'], job['updated_at']) != last_seen:
+                last_seen = (job['status'], job['updated_at'])
+                last_sent = time.time()
+                event = 'done' if job['status'] in FINISHED_STATES else 'progress'
+                yield f"event: {event}\ndata: {json.dumps(job_to_response(job))}\n\n"
+                if event == 'done':
+                    return
+            elif time.time() - last_sent > 15:
+                last_sent = time.time()
+                yield ": keep-alive\n\n"
+            time.sleep(0.5)
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@bp.app_errorhandler(AudiobookError)
+def handle_audiobook_error(e):
+    return jsonify({'error': str(e)}), e.status
+
+def audiobook_to_response(book_id):
+    manifest = audiobook_store.manifest(book_id)
+    for section in manifest['sections']:
+        section['url'] = f"/audiobooks/{book_id}/sections/{section['index']}" if section['ready'] else None
+    job = job_store.get(manifest['job_id']) if manifest.get('job_id') else None
+    manifest['job'] = job_to_response(job) if job else None
+    return manifest
+
+@bp.route('/audiobooks', methods=['POST'])
+def create_audiobook():
+    """Split a PDF (upload or upload_id) or text into sections and queue their synthesis."""
+    services.require('tts')
+    title = request.form.get("title")
+    try:
+        if "pdf" in request.files:
+            file = request.files["pdf"]
+            title = title or file.filename
+            pages = list(services.pdf_pages(file.stream))
+        elif request.form.get("upload_id"):
+            upload_id = request.form["upload_id"]
+            with upload_store.open(upload_id, kind="pdf") as f:
+                pages = list(services.pdf_pages(f))
+            upload_store.delete(upload_id)
+        else:
+            pages = paginate_text(request.form.get("text", ""))
+    except UploadError:
+        raise
+    except Exception as e:
+        return jsonify({"error": f"Could not extract text from PDF: {str(e)}"}), 400
+    audio_format = negotiate_audio_format()
+    if audio_format is None:
+        return jsonify({
+            "error": "Unsupported audio format",
+            "supported_formats": sorted(AUDIO_OUTPUT_FORMATS)
+        }), 406
+    sections = split_sections(pages, max_chars=int(os.getenv("AUDIOBOOK_SECTION_CHARS", "30000")))
+    book_id = audiobook_store.create(
+        sections, audio_format,
+        voice=request.form.get("voice", "af_heart"),
+        speed=float(request.form.get("speed", 1)),
+        title=title
+    )
+    job_id = job_store.submit('audiobook', {'book_id': book_id}, max_attempts=5)
+    audiobook_store.attach_job(book_id, job_id)
+    return jsonify({
+        'book_id': book_id,
+        'job_id': job_id,
+        'sections': len(sections),
+        'manifest_url': f'/audiobooks/{book_id}',
+        'events_url': f'/jobs/{job_id}/events'
+    }), 202
+
+@bp.route('/audiobooks/<book_id>', methods=['GET'])
+def get_audiobook(book_id):
+    return jsonify(audiobook_to_response(book_id))
+
+@bp.route('/audiobooks/<book_id>/sections/<int:index>', methods=['GET'])
+def get_audiobook_section(book_id, index):
+    path = audiobook_store.section_path(book_id, index)
+    if not os.path.exists(path):
+        response = jsonify({'error': 'Section not generated yet', 'book_id': book_id, 'index': index})
+        response.status_code = 404
+        response.headers['Retry-After'] = '10'
+        return response
+    book = audiobook_store.load(book_id)
+    # conditional=True makes send_file answer Range requests with 206 partial content.
+    return send_file(path, mimetype=AUDIO_OUTPUT_FORMATS[book['format']].mimetype, conditional=True, max_age=3600)
+
+@bp.route('/audiobooks/<book_id>/cancel', methods=['POST'])
+def cancel_audiobook(book_id):
+    book = audiobook_store.load(book_id)
+    if book.get('job_id'):
+        job_store.cancel(book['job_id'])
+    return jsonify(audiobook_to_response(book_id))
+
+@bp.route("/get-summary", methods=["GET"])
 def get_summary():
-    summary = agent_service.get_session_summary()
+    summary = services.agent_service.get_session_summary()
     return jsonify(summary.to_dict())
 
-model = whisper.load_model("base")
+@bp.route('/speech2text/ready', methods=['GET'])
+def speech2text_ready():
+    status = services.stt_model.status()
+    return jsonify(status), 200 if status['ready'] else 503
 
-@app.route('/speech2text', methods=['POST'])
-def transcribe():
-    temp_file = "temp_audio.wav"
+@bp.route('/speech2text/warmup', methods=['POST'])
+def speech2text_warmup():
+    if not services.stt_model.ready and not services.stt_model.status()['loading']:
+        try:
+            services.transcription_service.warm_up()
+        except TranscriptionRejected:
+            pass
+    return jsonify(services.stt_model.status()), 200 if services.stt_model.ready else 202
+
+@bp.route('/speech2text/stats', methods=['GET'])
+def speech2text_stats():
+    return jsonify(services.transcription_service.stats())
+
+@bp.app_errorhandler(TranscriptionRejected)
+def handle_transcription_rejected(e):
+    # The model server's own errors go out without stats, which would need
+    # another round trip to a sidecar that may be down.
+    stats = {} if isinstance(e, ModelServerError) else services.transcription_service.stats()
+    response = jsonify({'error': str(e), **stats})
+    response.status_code = e.status
+    if e.retry_after:
+        response.headers['Retry-After'] = str(max(1, int(e.retry_after + 0.5)))
+    return response
+
+def read_request_audio():
+    """Return (upload_id, audio bytes) from an upload_id, a multipart file or the raw body."""
+    services.require('stt')
+    upload_id = request.args.get('upload_id') or request.form.get('upload_id')
+    if upload_id:
+        with upload_store.open(upload_id, kind="audio") as f:
+            return upload_id, f.read()
     if 'file' in request.files:
-        file = request.files['file']
-        file.save(temp_file)
-    elif request.data:
-        with open(temp_file, "wb") as f:
-            f.write(request.data)
-    else:
+        return None, request.files['file'].read()
+    return None, request.get_data()
+
+def transcription_options():
+    options = {}
+    if request.form.get('language'):
+        options['language'] = request.form['language']
+    return options
+
+@bp.route('/speech2text', methods=['POST'])
+def transcribe():
+    upload_id, data = read_request_audio()
+    if not data:
         return jsonify({"error": "No audio data received"}), 400
-    result = model.transcribe(temp_file)
-    os.remove(temp_file)  
+    try:
+        audio = decode_mono(data, WHISPER_SAMPLE_RATE)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+    result = services.transcription_service.transcribe(audio, **transcription_options())
+    if upload_id:
+        upload_store.delete(upload_id)
     return jsonify({"text": result["text"]})
 
-@app.route('/explain-more', methods=['POST'])
+def spoken_answer(response):
+    """The part of an agent response worth reading aloud."""
+    for field in ('explanation', 'feedback', 'response', 'summary'):
+        text = getattr(response, field, None)
+        if isinstance(text, str) and text.strip():
+            return text
+    return ""
+
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+@bp.route('/voice-interaction', methods=['POST'])
+def voice_interaction():
+    """Spoken question in, spoken answer out, as one SSE stream.
+
+    Events arrive as each stage finishes: ``transcript``, then ``answer``
+    (the same JSON as /process-interaction), then one ``audio`` event per
+    synthesized segment (a self-contained clip, base64 encoded, in the
+    negotiated format) and finally ``done`` with stage timings. The first
+    audio segment is short and is sent while later ones are still being
+    synthesized, so playback starts well before the whole answer is voiced.
+    """
+    started = time.perf_counter()
+    upload_id, data = read_request_audio()
+    if not data:
+        return jsonify({"error": "No audio data received"}), 400
+    try:
+        audio = decode_mono(data, WHISPER_SAMPLE_RATE)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+    if upload_id:
+        upload_store.delete(upload_id)
+    audio_format = negotiate_audio_format()
+    if audio_format is None:
+        return jsonify({
+            "error": "Unsupported audio format",
+            "supported_formats": sorted(AUDIO_OUTPUT_FORMATS)
+        }), 406
+    options = transcription_options()
+    current_topic = request.form.get('current_topic')
+    active_subtopic = request.form.get('active_subtopic')
+    session_history = json.loads(request.form['session_history']) if request.form.get('session_history') else None
+    voice = request.form.get('voice', 'af_heart')
+    speed = float(request.form.get('speed', 1))
+
+    def elapsed():
+        return round(time.perf_counter() - started, 3)
+
+    def events():
+        timings = {}
+        try:
+            text = services.transcription_service.transcribe(audio, **options)["text"].strip()
+        except TranscriptionRejected as e:
+            yield sse_event('error', {'stage': 'transcription', 'error': str(e)})
+            return
+        timings['transcript'] = elapsed()
+        yield sse_event('transcript', {'text': text, 'elapsed': timings['transcript']})
+        if not text:
+            yield sse_event('done', {'timings': timings})
+            return
+
+        try:
+            response = services.agent_service.start_new_topic(
+                text, current_topic=current_topic, active_subtopic=active_subtopic, session_history=session_history
+            )
+        except Exception as e:
+            yield sse_event('error', {'stage': 'agent', 'error': str(e)})
+            return
+        timings['answer'] = elapsed()
+        yield sse_event('answer', {**response.to_dict(), 'elapsed': timings['answer']})
+
+        mimetype = AUDIO_OUTPUT_FORMATS[audio_format].mimetype
+        try:
+            for index, segment in enumerate(iter_audio_segments(spoken_answer(response), voice=voice, speed=speed)):
+                clip = b"".join(iter_encoded_stream([segment], services.pipeline.sample_rate, audio_format))
+                if index == 0:
+                    timings['first_audio'] = elapsed()
+                yield sse_event('audio', {
+                    'index': index,
+                    'mimetype': mimetype,
+                    'duration': len(segment) / services.pipeline.sample_rate,
+                    'data': base64.b64encode(clip).decode('ascii'),
+                    'elapsed': elapsed()
+                })
+        except Exception as e:
+            yield sse_event('error', {'stage': 'speech', 'error': str(e)})
+            return
+        timings['done'] = elapsed()
+        yield sse_event('done', {'timings': timings})
+
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def get_live_transcription(stream_id):
+    stream = services.live_transcriptions.get(stream_id)
+    if stream is None:
+        raise TranscriptionRejected("Unknown or expired stream", 404)
+    return stream
+
+@bp.route('/speech2text/streams', methods=['POST'])
+def create_live_transcription():
+    """Open a live transcription stream.
+
+    Post raw 16-bit little-endian mono PCM to ``chunks_url`` (``?sample_rate=``
+    defaults to 16000), read partial and final text from ``events_url``, and
+    post to ``end_url`` when recording stops.
+    """
+    data = request.get_json(silent=True) or {}
+    options = {'language': data['language']} if data.get('language') else {}
+    stream = services.live_transcriptions.create(**options)
+    stream_id = stream.stream_id
+    return jsonify({
+        **stream.status(),
+        'sample_rate': WHISPER_SAMPLE_RATE,
+        'chunks_url': f'/speech2text/streams/{stream_id}/chunks',
+        'events_url': f'/speech2text/streams/{stream_id}/events',
+        'end_url': f'/speech2text/streams/{stream_id}/end'
+    }), 201
+
+@bp.route('/speech2text/streams/<stream_id>/chunks', methods=['POST'])
+def push_live_transcription_chunk(stream_id):
+    stream = get_live_transcription(stream_id)
+    sample_rate = request.args.get('sample_rate', WHISPER_SAMPLE_RATE, type=int)
+    return jsonify(stream.feed_pcm16(request.get_data(), sample_rate))
+
+@bp.route('/speech2text/streams/<stream_id>/end', methods=['POST'])
+def end_live_transcription(stream_id):
+    return jsonify(get_live_transcription(stream_id).end())
+
+@bp.route('/speech2text/streams/<stream_id>/events', methods=['GET'])
+def live_transcription_events(stream_id):
+    stream = get_live_transcription(stream_id)
+
+    def events():
+        for event in stream.iter_events():
+            if event is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@bp.route('/explain-more', methods=['POST'])
 def explain_more():
     try:
         data = request.json
         question = data.get('question')
-        context = data.get('context', '')
+        context = relevant_context(data.get('context', ''), question)
         prompt = build_prompt_with_heading_and_diagram("More About This Topic", context, "🤔")
-        response_text = call_gemini_api(prompt, model_override=None)
+        response_text = call_gemini_api(prompt, model_override=None, agent="explain_more")
         if not response_text:
             return jsonify({'error': 'Failed to get response from AI APIs'}), 500
         return jsonify({'response': response_text, 'status': 'success'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/interactive-questions', methods=['POST'])
+@bp.route('/interactive-questions', methods=['POST'])
 def interactive_questions():
     try:
         data = request.json
@@ -466,7 +673,7 @@ def interactive_questions():
             "Return only a JSON array of question objects. Do not add any extra text before or after the array.\n"
             f"Topic: {context}"
         )
-        response_text = call_gemini_api(prompt, model_override="flash")
+        response_text = call_gemini_api(prompt, model_override="flash", agent="interactive_questions")
         try:
             questions = json.loads(response_text)
         except Exception:
@@ -481,5 +688,95 @@ def interactive_questions():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@bp.before_app_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@bp.after_app_request
+def record_request_latency(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            route=request.url_rule.rule if request.url_rule else 'unmatched',
+            method=request.method,
+            status=response.status_code
+        )
+    return response
+
+def local_stt_queue_depth():
+    # Only report a queue this process owns; never load the model for a scrape.
+    if services.enabled('stt') and services.is_loaded('transcription_service') and not model_server:
+        return services.transcription_service.queue_depth
+    return None
+
+STT_QUEUE_DEPTH.set_function(local_stt_queue_depth)
+JOB_QUEUE_DEPTH.set_function(job_store.queue_depth)
+LIVE_STREAMS.set_function(
+    lambda: len(services.live_transcriptions) if services.is_loaded('live_transcriptions') else None
+)
+
+@bp.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    # With the model server in use it reports the speech families; see metrics.py.
+    remote = model_server and (services.enabled('stt') or services.enabled('tts'))
+    body = metrics.render(exclude=metrics.MODEL_SERVER_FAMILIES if remote else ())
+    if remote:
+        try:
+            body += model_server.metrics()
+        except ModelServerError:
+            body += "# model server unavailable\n"
+    return Response(body, mimetype=None, content_type=metrics.CONTENT_TYPE)
+
+@bp.app_errorhandler(SubsystemDisabled)
+def handle_subsystem_disabled(e):
+    return jsonify({'error': str(e), 'subsystem': e.subsystem}), e.status
+
+@bp.route('/subsystems', methods=['GET'])
+def subsystems_status():
+    return jsonify(services.status())
+
+def env_flag(name):
+    return os.getenv(name, "").lower() in ("1", "true", "yes")
+
+def create_app(config=None):
+    """Build the Flask app.
+
+    ``config`` overrides the environment-derived defaults:
+    DISABLED_SUBSYSTEMS / PRELOAD_SUBSYSTEMS (subsets of stt, tts, pdf, llm),
+    WHISPER_WARMUP, JOB_INPROCESS_WORKERS and PROFILING_TOKEN. Nothing heavy
+    is imported here unless it is preloaded or warmed up.
+    """
+    app = Flask(__name__)
+    app.config.from_mapping(
+        DISABLED_SUBSYSTEMS=parse_subsystem_list(os.getenv("MINDFLOW_DISABLED_SUBSYSTEMS")),
+        PRELOAD_SUBSYSTEMS=parse_subsystem_list(os.getenv("MINDFLOW_PRELOAD_SUBSYSTEMS")),
+        WHISPER_WARMUP=env_flag("WHISPER_WARMUP"),
+        JOB_INPROCESS_WORKERS=int(os.getenv("JOB_INPROCESS_WORKERS", "0")),
+        PROFILING_TOKEN=os.getenv("MINDFLOW_PROFILING_TOKEN") or None,
+        PROFILE_DIR=os.path.join(CACHE_DIR, "profiles"),
+        PROFILE_INTERVAL=float(os.getenv("PROFILE_INTERVAL", "0.005"))
+    )
+    if config:
+        app.config.update(config)
+    services.configure(disabled=app.config['DISABLED_SUBSYSTEMS'])
+
+    CORS(app, resources={r"/*": {"origins": ["http://localhost:3000"], "methods": ["GET", "POST"], "allow_headers": ["Content-Type", "Upload-Offset", "X-Chunk-Sha256", "Range"], "expose_headers": ["Accept-Ranges", "Content-Range", "Content-Length"]}})
+    app.register_blueprint(bp)
+    # Off unless a token is configured; then see profiling.py for the routes.
+    init_profiling(app, app.config['PROFILING_TOKEN'], app.config['PROFILE_DIR'], app.config['PROFILE_INTERVAL'])
+
+    services.preload(app.config['PRELOAD_SUBSYSTEMS'])
+    # Workers that serve transcription can opt in to loading the model at boot;
+    # everyone else loads it on the first /speech2text request. The model
+    # server sidecar warms up its own copy.
+    if app.config['WHISPER_WARMUP'] and services.enabled('stt') and not model_server:
+        services.transcription_service.warm_up()
+    if app.config['JOB_INPROCESS_WORKERS']:
+        JobWorkerPool(job_store, job_handlers, workers=app.config['JOB_INPROCESS_WORKERS']).start()
+    return app
+
+app = create_app()
+
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
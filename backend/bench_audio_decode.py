@@ -0,0 +1,87 @@
+"""Benchmark per-request audio decoding for Whisper.
+
+Compares the old path (write the upload to disk, then let Whisper spawn
+``ffmpeg`` to decode and resample it, as ``whisper.load_audio`` does) with
+the in-process path used by /speech2text (soundfile decode plus polyphase
+resampling to 16 kHz). The ffmpeg rows are skipped when ffmpeg isn't on PATH.
+
+Usage: python bench_audio_decode.py [seconds_of_audio] [repeats]
+"""
+
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+
+from speech import WHISPER_SAMPLE_RATE, decode_mono
+
+FORMATS = [
+    ("WAV 16 kHz", "WAV", "PCM_16", 16000),
+    ("WAV 48 kHz", "WAV", "PCM_16", 48000),
+    ("FLAC 44.1 kHz", "FLAC", "PCM_16", 44100),
+    ("OGG/Opus 48 kHz", "OGG", "OPUS", 48000),
+]
+
+
+def make_clip(seconds, sample_rate, container, subtype):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    audio = 0.2 * np.sin(2 * np.pi * 220 * t) * (1 + np.sin(2 * np.pi * 3 * t)) / 2
+    buffer = io.BytesIO()
+    sf.write(buffer, audio.astype(np.float32), sample_rate, format=container, subtype=subtype)
+    return buffer.getvalue()
+
+
+def ffmpeg_path(data):
+    # Mirrors the old route: save the upload, then whisper.load_audio(path).
+    with tempfile.NamedTemporaryFile(suffix=".audio", delete=False) as f:
+        f.write(data)
+        path = f.name
+    try:
+        out = subprocess.run(
+            ["ffmpeg", "-nostdin", "-threads", "0", "-i", path, "-f", "s16le", "-ac", "1",
+             "-acodec", "pcm_s16le", "-ar", str(WHISPER_SAMPLE_RATE), "-"],
+            capture_output=True, check=True
+        ).stdout
+    finally:
+        os.remove(path)
+    return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+
+
+def in_process_path(data):
+    return decode_mono(data, WHISPER_SAMPLE_RATE)
+
+
+def timed(fn, data, repeats):
+    fn(data)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(data)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    has_ffmpeg = shutil.which("ffmpeg") is not None
+    print(f"{seconds:.0f} s clips, {repeats} repeats" + ("" if has_ffmpeg else " (ffmpeg not found, skipping it)"))
+    print(f"{'format':<18}{'in-process ms':>15}{'ffmpeg ms':>12}{'saved ms':>10}")
+    for label, container, subtype, sample_rate in FORMATS:
+        if subtype not in sf.available_subtypes(container):
+            continue
+        data = make_clip(seconds, sample_rate, container, subtype)
+        ours = timed(in_process_path, data, repeats)
+        if has_ffmpeg:
+            theirs = timed(ffmpeg_path, data, repeats)
+            print(f"{label:<18}{ours:>15.2f}{theirs:>12.2f}{theirs - ours:>10.2f}")
+        else:
+            print(f"{label:<18}{ours:>15.2f}{'-':>12}{'-':>10}")
+
+
+if __name__ == "__main__":
+    main()
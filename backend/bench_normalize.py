@@ -0,0 +1,65 @@
+"""Benchmark the per-page text normalizer against the old whole-document regex.
+
+Usage: python bench_normalize.py [megabytes]
+"""
+
+import random
+import re
+import sys
+import time
+
+from ingestion.normalize import normalize_text
+
+OLD_PATTERN = r"(\w+)\s*\n\s*(\w+)"
+WORDS = ["energy", "momentum", "ﬁeld", "equation", "theorem", "proof", "vector", "matrix", "the", "of", "is"]
+
+
+def make_page(rng, lines=45):
+    page = []
+    for _ in range(lines):
+        line = "  ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 12)))
+        if rng.random() < 0.1:
+            line += " exam-"
+        elif rng.random() < 0.2:
+            line += "."
+        page.append(line)
+    return "\n".join(page)
+
+
+def make_pages(megabytes, seed=0):
+    rng = random.Random(seed)
+    pages, size = [], 0
+    while size < megabytes * 1024 * 1024:
+        page = make_page(rng)
+        pages.append(page)
+        size += len(page)
+    return pages
+
+
+def time_call(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(label, pages):
+    size_mb = sum(len(page) for page in pages) / (1024 * 1024)
+    old = time_call(lambda: re.sub(OLD_PATTERN, r"\1 \2", "\n".join(pages)))
+    new = time_call(lambda: [normalize_text(page) for page in pages])
+    print(f"{label:<28} {size_mb:7.2f} MB  regex {old * 1000:9.1f} ms  normalizer {new * 1000:9.1f} ms  speedup {old / new:5.2f}x")
+
+
+def main():
+    megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 4
+    report("textbook-like pages", make_pages(megabytes))
+    # Fill-in-the-blank rules and long identifiers hurt the old pattern: its
+    # backtracking is quadratic in the length of each run of word characters
+    # that is not followed by a line break.
+    report("long word-character runs", [("_" * 8000 + " blank\n") * 4 for _ in range(4)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Measure app start-up cost: import time and resident memory per configuration.
+
+Each configuration imports ``app`` in a fresh interpreter, so nothing is
+shared between runs. ``lazy`` is the default (subsystems built on first
+use); ``eager`` preloads every subsystem, which is roughly what importing
+app.py cost before subsystems were made lazy.
+
+Usage: python bench_startup.py [repeats]
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+import app
+seconds = time.perf_counter() - started
+rss_kb = None
+try:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                rss_kb = int(line.split()[1])
+except OSError:
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"seconds": seconds, "rss_mb": rss_kb / 1024, "modules": len(sys.modules)}))
+"""
+
+CONFIGURATIONS = [
+    ("lazy", {}),
+    ("no stt,tts", {"MINDFLOW_DISABLED_SUBSYSTEMS": "stt,tts"}),
+    ("llm only", {"MINDFLOW_DISABLED_SUBSYSTEMS": "stt,tts,pdf"}),
+    ("eager", {"MINDFLOW_PRELOAD_SUBSYSTEMS": "stt,tts,pdf,llm"}),
+]
+
+
+def measure(env_overrides):
+    env = dict(os.environ, MINDFLOW_DISABLED_SUBSYSTEMS="", MINDFLOW_PRELOAD_SUBSYSTEMS="")
+    env.update(env_overrides)
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True
+    )
+    if output.returncode != 0:
+        return None, output.stderr.strip().splitlines()[-1]
+    return json.loads(output.stdout.strip().splitlines()[-1]), None
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    print(f"{'configuration':<14}{'import s':>10}{'RSS MB':>10}{'modules':>10}")
+    for label, env_overrides in CONFIGURATIONS:
+        runs = []
+        for _ in range(repeats):
+            result, error = measure(env_overrides)
+            if error:
+                print(f"{label:<14}  failed: {error}")
+                break
+            runs.append(result)
+        if len(runs) == repeats:
+            best = min(runs, key=lambda run: run["seconds"])
+            print(f"{label:<14}{best['seconds']:>10.2f}{best['rss_mb']:>10.1f}{best['modules']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Benchmark KPipeline throughput against pool size using a local stand-in TTS.
+
+The stand-in sleeps for a fixed round-trip latency plus a per-character
+cost, which is roughly how a remote TTS service behaves, and returns
+silence of a matching length.
+
+Usage: python bench_tts_pool.py [latency_ms] [ms_per_char]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from kokoro import KPipeline
+
+SAMPLE_RATE = 24000
+TEXT = " ".join(
+    f"Sentence number {i} explains one more idea about thermodynamics and entropy."
+    for i in range(120)
+)
+
+
+def make_backend(latency, per_char):
+    def synthesize(text, voice=None, speed=1):
+        time.sleep(latency + per_char * len(text))
+        return np.zeros(int(SAMPLE_RATE * len(text) / 15), dtype=np.float32)
+    return synthesize
+
+
+def run(pool_size, backend):
+    pipeline = KPipeline(lang_code='a', max_workers=pool_size, synthesize=backend)
+    start = time.perf_counter()
+    first = None
+    segments = 0
+    samples = 0
+    for _, _, audio in pipeline(TEXT):
+        if first is None:
+            first = time.perf_counter() - start
+        segments += 1
+        samples += len(audio)
+    elapsed = time.perf_counter() - start
+    return first, elapsed, segments, samples / SAMPLE_RATE
+
+
+def main():
+    latency = float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0.25
+    per_char = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.5
+    backend = make_backend(latency, per_char)
+    print(f"{len(TEXT)} chars, latency {latency * 1000:.0f} ms, {per_char * 1000:.2f} ms/char")
+    baseline = None
+    for pool_size in (1, 2, 4, 8, 16):
+        first, elapsed, segments, audio_seconds = run(pool_size, backend)
+        baseline = baseline or elapsed
+        print(
+            f"pool={pool_size:<3} segments={segments:<4} first={first * 1000:7.1f} ms  "
+            f"total={elapsed:6.2f} s  realtime x{audio_seconds / elapsed:6.1f}  speedup {baseline / elapsed:4.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
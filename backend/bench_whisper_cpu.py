@@ -0,0 +1,92 @@
+"""Compare Whisper CPU inference profiles on accuracy and real-time factor.
+
+Point it at a directory of clips, each with a reference transcript next to
+it (``lecture1.wav`` + ``lecture1.txt``). Every profile transcribes every
+clip and reports word error rate against the references and the real-time
+factor (seconds of compute per second of audio, lower is better).
+
+Profiles:
+  fp32 default    whisper.load_model as before, torch's default threading
+  fp32 tuned      same weights, explicit intra/inter-op threads
+  int8 dynamic    WhisperModelLoader.cpu_profile: int8 linear layers
+
+Usage: python bench_whisper_cpu.py CLIP_DIR [model] [workers]
+"""
+
+import os
+import re
+import sys
+import time
+
+from speech import WHISPER_SAMPLE_RATE, WhisperModelLoader, decode_mono
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".ogg", ".mp3")
+
+
+def load_clips(directory):
+    clips = []
+    for name in sorted(os.listdir(directory)):
+        stem, extension = os.path.splitext(name)
+        reference_path = os.path.join(directory, stem + ".txt")
+        if extension.lower() not in AUDIO_EXTENSIONS or not os.path.exists(reference_path):
+            continue
+        with open(os.path.join(directory, name), "rb") as f:
+            audio = decode_mono(f.read(), WHISPER_SAMPLE_RATE)
+        with open(reference_path, "r", encoding="utf-8") as f:
+            clips.append((name, audio, f.read()))
+    return clips
+
+
+def words(text):
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_error_rate(reference, hypothesis):
+    reference, hypothesis = words(reference), words(hypothesis)
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / max(1, len(reference))
+
+
+def run(label, loader, clips):
+    started = time.perf_counter()
+    loader.get()
+    load_seconds = time.perf_counter() - started
+    loader.warm_up()
+    errors = 0.0
+    audio_seconds = 0.0
+    compute_seconds = 0.0
+    for _, audio, reference in clips:
+        started = time.perf_counter()
+        result = loader.transcribe(audio, language="en", temperature=0.0)
+        compute_seconds += time.perf_counter() - started
+        audio_seconds += len(audio) / WHISPER_SAMPLE_RATE
+        errors += word_error_rate(reference, result["text"])
+    print(f"{label:<14}{load_seconds:>8.1f}{errors / len(clips) * 100:>8.1f}{compute_seconds / audio_seconds:>8.3f}")
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    clips = load_clips(sys.argv[1])
+    if not clips:
+        sys.exit("No clips with reference transcripts found")
+    model_name = sys.argv[2] if len(sys.argv) > 2 else "base"
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    total = sum(len(audio) for _, audio, _ in clips) / WHISPER_SAMPLE_RATE
+    print(f"{len(clips)} clips, {total:.0f} s of audio, model {model_name}, {threads} threads per worker")
+    print(f"{'profile':<14}{'load s':>8}{'WER %':>8}{'RTF':>8}")
+    # Each profile changes process-wide torch threading, so run them in order
+    # from least to most specific.
+    run("fp32 default", WhisperModelLoader(model_name, device="cpu"), clips)
+    run("fp32 tuned", WhisperModelLoader(model_name, device="cpu", threads=threads, interop_threads=1), clips)
+    run("int8 dynamic", WhisperModelLoader.cpu_profile(model_name, workers=workers), clips)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+MindFlow Ingestion Module
+This module contains the document extraction and preprocessing pipeline.
+"""
+
+from .cleaning import CleaningStats, NearDuplicateFilter, drop_near_duplicates, strip_repeated_lines
+from .extract import iter_pdf_pages, iter_raw_pdf_pages
+from .normalize import normalize_text
+from .pipeline import DownloadError, IngestionError, PipelineStats, StreamingSummarizer, iter_chunks
+from .remote import FetchResult, RemoteDocumentFetcher, TextCache, UrlMetadataCache, looks_like_pdf
+from .spool import new_spool
+from .uploads import ChunkedUploadStore, UploadError
+
+__all__ = [
+    'ChunkedUploadStore',
+    'CleaningStats',
+    'DownloadError',
+    'FetchResult',
+    'IngestionError',
+    'NearDuplicateFilter',
+    'PipelineStats',
+    'RemoteDocumentFetcher',
+    'StreamingSummarizer',
+    'TextCache',
+    'UploadError',
+    'UrlMetadataCache',
+    'drop_near_duplicates',
+    'iter_chunks',
+    'iter_pdf_pages',
+    'iter_raw_pdf_pages',
+    'looks_like_pdf',
+    'new_spool',
+    'normalize_text',
+    'strip_repeated_lines'
+]
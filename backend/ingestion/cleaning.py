@@ -0,0 +1,195 @@
+"""Removal of running headers, footers, page numbers and duplicate pages."""
+
+import re
+import zlib
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+_DIGITS_RE = re.compile(r"\b\d+\b")
+# Roman numerals are limited to well-formed lowercase ones up to xxxix (front
+# matter), so edge lines such as "I", "mix" or "civil" are kept.
+_PAGE_NUMBER_RE = re.compile(
+    r"^\s*(?:(?i:page)\s*)?(?:\d+|(?=[ivx])x{0,3}(?:ix|iv|v?i{0,3}))(?:\s*(?i:of|/)\s*\d+)?\s*$"
+)
+_WORD_RE = re.compile(r"\w+")
+
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class CleaningStats:
+    characters_removed: int = 0
+    lines_removed: int = 0
+    pages_dropped: int = 0
+    extraction_errors: int = 0
+
+    @property
+    def estimated_tokens_removed(self) -> int:
+        return (self.characters_removed + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+    def add(self, other: "CleaningStats") -> None:
+        self.characters_removed += other.characters_removed
+        self.lines_removed += other.lines_removed
+        self.pages_dropped += other.pages_dropped
+        self.extraction_errors += other.extraction_errors
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CleaningStats":
+        return cls(
+            characters_removed=data.get("characters_removed", 0),
+            lines_removed=data.get("lines_removed", 0),
+            pages_dropped=data.get("pages_dropped", 0),
+            extraction_errors=data.get("extraction_errors", 0)
+        )
+
+    def to_dict(self):
+        return {
+            "characters_removed": self.characters_removed,
+            "estimated_tokens_removed": self.estimated_tokens_removed,
+            "lines_removed": self.lines_removed,
+            "pages_dropped": self.pages_dropped,
+            "extraction_errors": self.extraction_errors
+        }
+
+
+def _line_key(line: str) -> str:
+    # Page and chapter numbers change from page to page; mask them so
+    # "Chapter 3 | 41" and "Chapter 3 | 42" count as the same header.
+    return _DIGITS_RE.sub("#", " ".join(line.lower().split()))
+
+
+def _edge_indexes(lines: List[str], edge_lines: int) -> List[int]:
+    filled = [i for i, line in enumerate(lines) if line.strip()]
+    if len(filled) <= 2 * edge_lines:
+        return filled
+    return filled[:edge_lines] + filled[-edge_lines:]
+
+
+def strip_repeated_lines(
+    pages: Iterable[str],
+    stats: Optional[CleaningStats] = None,
+    edge_lines: int = 3,
+    min_repeats: int = 3,
+    window: int = 8
+) -> Iterator[str]:
+    """Drop header/footer lines that repeat across the pages of one document.
+
+    Only the first and last ``edge_lines`` non-empty lines of a page are
+    candidates. A candidate is removed once the same line (ignoring numbers)
+    has appeared at a page edge ``min_repeats`` times, or if it is a bare
+    page number. The first ``window`` pages are held back so the opening
+    pages are cleaned with the same knowledge as the rest; after that, pages
+    stream through with counts updated as they go.
+    """
+    counts: Counter = Counter()
+    pending: List[List[str]] = []
+
+    def observe(lines: List[str]) -> None:
+        counts.update({_line_key(lines[i]) for i in _edge_indexes(lines, edge_lines)})
+
+    def clean(lines: List[str]) -> str:
+        drop = {
+            i for i in _edge_indexes(lines, edge_lines)
+            if counts[_line_key(lines[i])] >= min_repeats or _PAGE_NUMBER_RE.match(lines[i])
+        }
+        if stats is not None and drop:
+            stats.lines_removed += len(drop)
+            stats.characters_removed += sum(len(lines[i]) + 1 for i in drop)
+        return "\n".join(line for i, line in enumerate(lines) if i not in drop)
+
+    for page in pages:
+        lines = page.splitlines()
+        observe(lines)
+        if len(pending) < window:
+            pending.append(lines)
+            if len(pending) < window:
+                continue
+            for held in pending:
+                yield clean(held)
+            continue
+        yield clean(lines)
+
+    if len(pending) < window:
+        for held in pending:
+            yield clean(held)
+
+
+class NearDuplicateFilter:
+    """MinHash/LSH filter that drops texts nearly identical to one already seen.
+
+    Texts are shingled into overlapping word n-grams; each MinHash signature
+    is split into bands and indexed so that only texts sharing a band are
+    compared. A text is a duplicate when the estimated Jaccard similarity to
+    an earlier text is at least ``threshold``.
+    """
+
+    _PRIME = (1 << 61) - 1
+
+    def __init__(self, threshold: float = 0.85, shingle_size: int = 5, bands: int = 16, rows: int = 4):
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.bands = bands
+        self.rows = rows
+        permutations = bands * rows
+        # Fixed coefficients keep signatures stable across processes.
+        self._coefficients = [
+            (zlib.crc32(b"a%d" % i) | 1, zlib.crc32(b"b%d" % i))
+            for i in range(permutations)
+        ]
+        self._buckets: Dict[tuple, List[int]] = defaultdict(list)
+        self._signatures: List[List[int]] = []
+
+    def _shingles(self, text: str) -> Set[int]:
+        words = _WORD_RE.findall(text.lower())
+        size = self.shingle_size
+        if len(words) < size:
+            return {zlib.crc32(" ".join(words).encode())} if words else set()
+        return {
+            zlib.crc32(" ".join(words[i:i + size]).encode())
+            for i in range(len(words) - size + 1)
+        }
+
+    def _signature(self, shingles: Set[int]) -> List[int]:
+        prime = self._PRIME
+        return [min((a * shingle + b) % prime for shingle in shingles) for a, b in self._coefficients]
+
+    def is_duplicate(self, text: str) -> bool:
+        """Return True if ``text`` duplicates an earlier one; otherwise remember it."""
+        shingles = self._shingles(text)
+        if not shingles:
+            return False
+        signature = self._signature(shingles)
+        rows = self.rows
+        bands = [tuple(signature[i:i + rows]) + (i,) for i in range(0, len(signature), rows)]
+
+        candidates = set()
+        for band in bands:
+            candidates.update(self._buckets.get(band, ()))
+        for candidate in candidates:
+            other = self._signatures[candidate]
+            matches = sum(1 for x, y in zip(signature, other) if x == y)
+            if matches / len(signature) >= self.threshold:
+                return True
+
+        text_id = len(self._signatures)
+        self._signatures.append(signature)
+        for band in bands:
+            self._buckets[band].append(text_id)
+        return False
+
+
+def drop_near_duplicates(
+    texts: Iterable[str],
+    stats: Optional[CleaningStats] = None,
+    threshold: float = 0.85
+) -> Iterator[str]:
+    """Yield texts, skipping any that nearly duplicate an earlier one."""
+    duplicates = NearDuplicateFilter(threshold=threshold)
+    for text in texts:
+        if duplicates.is_duplicate(text):
+            if stats is not None:
+                stats.pages_dropped += 1
+                stats.characters_removed += len(text)
+            continue
+        yield text
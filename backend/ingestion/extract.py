@@ -0,0 +1,88 @@
+"""Page-by-page text extraction from PDF files."""
+
+import logging
+import time
+from typing import BinaryIO, Iterator, Optional, Union
+
+from metrics import PDF_PAGES, PDF_PARSE_SECONDS
+
+from .cleaning import CleaningStats, strip_repeated_lines
+from .normalize import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+def iter_raw_pdf_pages(source: Union[str, BinaryIO], stats: Optional[CleaningStats] = None) -> Iterator[str]:
+    """Yield the unprocessed text of each non-empty page as soon as it is parsed.
+
+    ``source`` is a path or a seekable binary file object. pypdf is tried
+    first; if it fails, pdfplumber resumes at the page pypdf failed on, and
+    if it finds no text at all, pdfplumber reads the whole file. Both are imported on first use so that
+    processes which never read a PDF don't load them.
+
+    A page pdfplumber cannot read is skipped; that, and a file neither
+    parser can open, is logged and counted in ``stats.extraction_errors``.
+    """
+    from pypdf import PdfReader
+
+    delivered = 0
+    next_page = 0
+    try:
+        reader = PdfReader(source)
+        for index, page in enumerate(reader.pages):
+            started = time.perf_counter()
+            page_text = page.extract_text()
+            PDF_PAGES.inc(parser="pypdf")
+            PDF_PARSE_SECONDS.inc(time.perf_counter() - started, parser="pypdf")
+            next_page = index + 1
+            if page_text and page_text.strip():
+                delivered += 1
+                yield page_text
+        if delivered:
+            return
+        next_page = 0
+    except Exception:
+        logger.warning("pypdf failed after %d pages, falling back to pdfplumber", next_page, exc_info=True)
+
+    try:
+        import pdfplumber
+
+        if hasattr(source, "seek"):
+            source.seek(0)
+        with pdfplumber.open(source) as pdf:
+            for number, page in enumerate(pdf.pages[next_page:], next_page + 1):
+                started = time.perf_counter()
+                try:
+                    page_text = page.extract_text()
+                except Exception:
+                    logger.warning("pdfplumber could not read page %d", number, exc_info=True)
+                    if stats is not None:
+                        stats.extraction_errors += 1
+                    continue
+                PDF_PAGES.inc(parser="pdfplumber")
+                PDF_PARSE_SECONDS.inc(time.perf_counter() - started, parser="pdfplumber")
+                if page_text and page_text.strip():
+                    yield page_text
+    except Exception:
+        logger.warning("Could not read PDF with pdfplumber", exc_info=True)
+        if stats is not None:
+            stats.extraction_errors += 1
+
+
+def iter_pdf_pages(
+    source: Union[str, BinaryIO],
+    stats: Optional[CleaningStats] = None,
+    strip_boilerplate: bool = True
+) -> Iterator[str]:
+    """Yield cleaned, normalized page text for a PDF.
+
+    Running headers, footers and page numbers are stripped while the line
+    structure is still intact, then each page is normalized.
+    """
+    pages = iter_raw_pdf_pages(source, stats)
+    if strip_boilerplate:
+        pages = strip_repeated_lines(pages, stats)
+    for page in pages:
+        text = normalize_text(page)
+        if text:
+            yield text
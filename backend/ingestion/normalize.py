@@ -0,0 +1,54 @@
+"""Linear-time cleanup of text extracted from a single PDF page."""
+
+import unicodedata
+
+# Characters that only affect layout and never belong in prompt text.
+_INVISIBLE = dict.fromkeys(map(ord, "\u00ad\u200b\u200c\u200d\u2060\ufeff"))
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def normalize_text(text: str) -> str:
+    """Normalize one page of extracted text in a single pass over its lines.
+
+    - Unicode is NFKC-normalized, which also expands ligatures such as "ﬁ".
+    - Runs of whitespace inside a line collapse to a single space.
+    - A word hyphenated across a line break is rejoined ("exam-\\nple").
+    - A line break between two word characters becomes a space, matching the
+      old ``(\\w+)\\s*\\n\\s*(\\w+)`` substitution; other breaks are kept.
+    - Blank lines collapse to a single paragraph break.
+    """
+    if not text:
+        return ""
+    if not text.isascii():
+        text = unicodedata.normalize("NFKC", text).translate(_INVISIBLE)
+
+    parts = []
+    previous = ""
+    paragraph_break = False
+    for raw_line in text.splitlines():
+        words = raw_line.split()
+        if not words:
+            paragraph_break = bool(previous)
+            continue
+        line = " ".join(words)
+        if previous:
+            if paragraph_break:
+                parts.append("\n\n")
+            elif (
+                previous[-1] == "-"
+                and len(previous) > 1
+                and previous[-2].isalpha()
+                and line[0].islower()
+            ):
+                parts[-1] = previous[:-1]
+            elif _is_word_char(previous[-1]) and _is_word_char(line[0]):
+                parts.append(" ")
+            else:
+                parts.append("\n")
+        parts.append(line)
+        previous = line
+        paragraph_break = False
+    return "".join(parts)
@@ -0,0 +1,139 @@
+"""Streaming extraction -> chunking -> summarization pipeline."""
+
+import itertools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionError(Exception):
+    """Raised by a page source when an input cannot be downloaded or read."""
+
+
+class DownloadError(IngestionError):
+    """An input could not be fetched for a reason that may clear up on retry."""
+
+
+@dataclass
+class PipelineStats:
+    pages: int = 0
+    characters: int = 0
+    chunks: int = 0
+    failed_chunks: int = 0
+
+
+_BREAKS = ("\n\n", "\n", ". ", " ")
+
+
+def _find_break(text: str, limit: int) -> int:
+    """Index at which to cut ``text`` so the head is at most ``limit`` chars."""
+    floor = limit // 2
+    for separator in _BREAKS:
+        position = text.rfind(separator, floor, limit)
+        if position != -1:
+            return position + len(separator)
+    return limit
+
+
+def iter_chunks(
+    pages: Iterable[str],
+    chunk_size: int = 12000,
+    stats: Optional[PipelineStats] = None
+) -> Iterator[str]:
+    """Regroup a stream of pages into chunks of roughly ``chunk_size`` chars.
+
+    Only the current partial chunk is buffered, so memory does not grow with
+    the document.
+    """
+    buffer = ""
+    for page in pages:
+        page = page.strip()
+        if not page:
+            continue
+        if stats is not None:
+            stats.pages += 1
+            stats.characters += len(page)
+        buffer = f"{buffer}\n\n{page}" if buffer else page
+        while len(buffer) >= chunk_size:
+            cut = _find_break(buffer, chunk_size)
+            head, buffer = buffer[:cut].strip(), buffer[cut:].lstrip()
+            if head:
+                if stats is not None:
+                    stats.chunks += 1
+                yield head
+    if buffer:
+        if stats is not None:
+            stats.chunks += 1
+        yield buffer
+
+
+class StreamingSummarizer:
+    """Map-reduce summarization that overlaps LLM calls with extraction.
+
+    Chunks are pulled from the input iterator on the caller's thread and
+    ``map_fn`` runs on a thread pool. At most ``max_in_flight`` chunks are
+    queued or running at once; when that limit is reached the caller blocks,
+    which stops it from parsing further pages until a slot frees up.
+
+    A document that fits in one chunk is sent straight to ``reduce_fn`` so
+    short inputs still cost a single LLM call. Chunks whose summary failed or
+    came back empty are logged, counted in ``stats.failed_chunks`` and left
+    out of the reduce step.
+    """
+
+    def __init__(
+        self,
+        map_fn: Callable[[str], Optional[str]],
+        reduce_fn: Callable[[str], Optional[str]],
+        max_workers: int = 3,
+        max_in_flight: int = 4
+    ):
+        self.map_fn = map_fn
+        self.reduce_fn = reduce_fn
+        self.max_workers = max_workers
+        self.max_in_flight = max(max_in_flight, max_workers)
+
+    def _safe_map(self, chunk: str) -> Optional[str]:
+        try:
+            return self.map_fn(chunk)
+        except Exception:
+            logger.exception("Summarizing a %d character chunk failed", len(chunk))
+            return None
+
+    def run(self, chunks: Iterable[str], stats: Optional[PipelineStats] = None) -> Optional[str]:
+        iterator = iter(chunks)
+        first = next(iterator, None)
+        if first is None:
+            return None
+        second = next(iterator, None)
+        if second is None:
+            return self.reduce_fn(first)
+
+        slots = threading.BoundedSemaphore(self.max_in_flight)
+        futures = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            try:
+                for chunk in itertools.chain((first, second), iterator):
+                    slots.acquire()
+                    future = executor.submit(self._safe_map, chunk)
+                    future.add_done_callback(lambda _: slots.release())
+                    futures.append(future)
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+            partials = [future.result() for future in futures]
+
+        failed = sum(1 for partial in partials if not partial)
+        if failed:
+            logger.warning("%d of %d chunk summaries failed", failed, len(partials))
+            if stats is not None:
+                stats.failed_chunks += failed
+        partials = [partial for partial in partials if partial]
+        if not partials:
+            return None
+        return self.reduce_fn("\n\n".join(partials))
@@ -0,0 +1,276 @@
+"""Conditional fetching of remote PDFs backed by URL metadata and text caches.
+
+``UrlMetadataCache`` remembers the validators (ETag, Last-Modified), size and
+SHA-256 of the last download of each URL. ``TextCache`` stores extracted,
+cleaned page text keyed by that content hash. A repeat fetch sends a
+conditional GET; on ``304 Not Modified`` the pages come straight from the
+text cache without downloading or parsing anything.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+
+from metrics import CACHE_HITS, CACHE_MISSES
+
+from .cleaning import CleaningStats
+from .extract import iter_pdf_pages
+from .spool import SPOOL_CHUNK_SIZE, SPOOL_MAX_MEMORY, new_spool
+
+# Bump when extraction, cleaning or normalization output changes so that
+# stale cached text is not served.
+TEXT_CACHE_VERSION = 1
+PDF_SNIFF_BYTES = 1024
+
+
+def looks_like_pdf(first_bytes: bytes) -> bool:
+    """PDF readers accept the ``%PDF`` header anywhere in the first 1 KiB."""
+    return b"%PDF" in first_bytes[:PDF_SNIFF_BYTES]
+
+
+@dataclass
+class UrlMetadata:
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_length: int
+    content_hash: str
+    fetched_at: float
+
+
+class UrlMetadataCache:
+    """SQLite table of per-URL validators, shared by all worker processes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS url_metadata ("
+                "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, "
+                "content_length INTEGER NOT NULL, content_hash TEXT NOT NULL, "
+                "fetched_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, url: str) -> Optional[UrlMetadata]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT url, etag, last_modified, content_length, content_hash, fetched_at "
+                "FROM url_metadata WHERE url = ?",
+                (url,)
+            ).fetchone()
+        (CACHE_HITS if row else CACHE_MISSES).inc(cache="url_metadata")
+        return UrlMetadata(*row) if row else None
+
+    def put(self, metadata: UrlMetadata) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO url_metadata VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    metadata.url,
+                    metadata.etag,
+                    metadata.last_modified,
+                    metadata.content_length,
+                    metadata.content_hash,
+                    metadata.fetched_at
+                )
+            )
+
+
+class TextCache:
+    """Content-addressed store of extracted page text, bounded in total size.
+
+    Entries are gzip-compressed JSON files; the least recently used ones are
+    removed once the directory grows past ``max_bytes``.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, content_hash: str) -> str:
+        return os.path.join(self.directory, f"{content_hash}.v{TEXT_CACHE_VERSION}.json.gz")
+
+    def contains(self, content_hash: str) -> bool:
+        return os.path.exists(self._path(content_hash))
+
+    def get(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        path = self._path(content_hash)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            CACHE_MISSES.inc(cache="text")
+            return None
+        CACHE_HITS.inc(cache="text")
+        return entry
+
+    def put(self, content_hash: str, pages: List[str], cleaning: Optional[CleaningStats] = None) -> None:
+        entry = {
+            "pages": pages,
+            "cleaning": (cleaning or CleaningStats()).to_dict()
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(content_hash))
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json.gz"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+
+@dataclass
+class FetchResult:
+    url: str
+    content_hash: str
+    document: Optional[tempfile.SpooledTemporaryFile]
+    first_bytes: bytes = b""
+
+    @property
+    def not_modified(self) -> bool:
+        return self.document is None
+
+
+class RemoteDocumentFetcher:
+    def __init__(self, metadata_cache: UrlMetadataCache, text_cache: TextCache, timeout: int = 30):
+        self.metadata_cache = metadata_cache
+        self.text_cache = text_cache
+        self.timeout = timeout
+
+    def fetch(self, url: str, conditional: bool = True) -> FetchResult:
+        """Download ``url`` into a spool, or confirm the cached copy is current.
+
+        Conditional headers are only sent when the text for the last known
+        content hash is still cached, so a 304 can always be served.
+        Raises ``requests.RequestException`` on network or HTTP errors.
+        """
+        cached = self.metadata_cache.get(url) if conditional else None
+        headers = {}
+        if cached and self.text_cache.contains(cached.content_hash):
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        with requests.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if response.status_code == 304 and headers:
+                return FetchResult(url, cached.content_hash, None)
+            response.raise_for_status()
+
+            spool = new_spool()
+            try:
+                length = response.headers.get("content-length", "")
+                if length.isdigit() and int(length) > SPOOL_MAX_MEMORY:
+                    spool.rollover()
+                hasher = hashlib.sha256()
+                first_bytes = b""
+                size = 0
+                for chunk in response.iter_content(chunk_size=SPOOL_CHUNK_SIZE):
+                    if len(first_bytes) < PDF_SNIFF_BYTES:
+                        first_bytes += chunk[:PDF_SNIFF_BYTES - len(first_bytes)]
+                    hasher.update(chunk)
+                    spool.write(chunk)
+                    size += len(chunk)
+                spool.seek(0)
+            except BaseException:
+                spool.close()
+                raise
+
+            content_hash = hasher.hexdigest()
+            self.metadata_cache.put(UrlMetadata(
+                url=url,
+                etag=response.headers.get("etag"),
+                last_modified=response.headers.get("last-modified"),
+                content_length=size,
+                content_hash=content_hash,
+                fetched_at=time.time()
+            ))
+        return FetchResult(url, content_hash, spool, first_bytes)
+
+    def iter_pages(
+        self,
+        url: str,
+        stats: Optional[CleaningStats] = None,
+        max_cached_chars: int = 10 * 1024 * 1024
+    ) -> Iterator[str]:
+        """Yield cleaned page text for a remote PDF, using the caches when possible.
+
+        Nothing is yielded for content that is not a PDF. Pages of newly
+        downloaded documents are streamed as they are extracted and cached
+        afterwards, unless their text exceeds ``max_cached_chars``. Documents
+        that yielded no text or hit extraction errors are not cached, so a
+        transient failure is retried on the next request.
+        """
+        result = self.fetch(url)
+        cached = self.text_cache.get(result.content_hash)
+        if cached is None and result.not_modified:
+            # Evicted between the conditional request and now.
+            result = self.fetch(url, conditional=False)
+            cached = self.text_cache.get(result.content_hash)
+
+        if cached is not None:
+            if result.document is not None:
+                result.document.close()
+            if stats is not None:
+                stats.add(CleaningStats.from_dict(cached.get("cleaning", {})))
+            yield from cached["pages"]
+            return
+
+        with result.document:
+            if not looks_like_pdf(result.first_bytes):
+                return
+            document_stats = CleaningStats()
+            pages: Optional[List[str]] = []
+            cached_chars = 0
+            try:
+                for page in iter_pdf_pages(result.document, document_stats):
+                    if pages is not None:
+                        cached_chars += len(page)
+                        if cached_chars <= max_cached_chars:
+                            pages.append(page)
+                        else:
+                            pages = None
+                    yield page
+            finally:
+                if stats is not None:
+                    stats.add(document_stats)
+            if pages and not document_stats.extraction_errors:
+                self.text_cache.put(result.content_hash, pages, document_stats)
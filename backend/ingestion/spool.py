@@ -0,0 +1,23 @@
+"""Memory-bounded spooling of downloaded documents.
+
+Small documents stay in memory; anything larger than ``SPOOL_MAX_MEMORY``
+rolls over to an anonymous, uniquely named temporary file that is removed
+as soon as the spool is closed. Spools are seekable binary file objects and
+can be passed straight to the PDF extractors.
+"""
+
+import os
+import tempfile
+from typing import Optional
+
+SPOOL_MAX_MEMORY = int(os.getenv("SPOOL_MAX_MEMORY", str(8 * 1024 * 1024)))
+SPOOL_CHUNK_SIZE = 64 * 1024
+
+
+def new_spool(max_memory: Optional[int] = None) -> tempfile.SpooledTemporaryFile:
+    return tempfile.SpooledTemporaryFile(
+        max_size=max_memory or SPOOL_MAX_MEMORY,
+        mode="w+b",
+        prefix="mindflow-",
+        suffix=".spool"
+    )
@@ -0,0 +1,199 @@
+"""Chunked, resumable uploads written straight to disk.
+
+Protocol:
+
+1. ``create`` registers an upload with its total size (and optionally the
+   SHA-256 of the whole file) and returns an id plus the maximum chunk size.
+2. Each chunk is sent with the offset it starts at and its SHA-256. A chunk
+   is accepted only at the current end of the partial file, so a client
+   that lost track after a network error asks for ``status`` and resumes
+   from the reported offset.
+3. ``complete`` checks the size and whole-file checksum; the upload can then
+   be opened as a regular file by the extraction and transcription paths.
+
+State lives entirely on disk (``<id>.json`` next to ``<id>.part``), so any
+worker process can serve any chunk. At most one chunk is held in memory.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from typing import Any, BinaryIO, Dict, Optional
+
+_UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+_READ_SIZE = 64 * 1024
+
+UPLOAD_KINDS = ("pdf", "audio")
+
+
+class UploadError(Exception):
+    def __init__(self, message: str, status: int = 400, **details: Any):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+
+class ChunkedUploadStore:
+    def __init__(
+        self,
+        directory: str,
+        max_chunk_size: int = 8 * 1024 * 1024,
+        max_upload_size: int = 512 * 1024 * 1024,
+        ttl: float = 24 * 3600
+    ):
+        self.directory = directory
+        self.max_chunk_size = max_chunk_size
+        self.max_upload_size = max_upload_size
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, upload_id: str):
+        if not _UPLOAD_ID_RE.match(upload_id or ""):
+            raise UploadError("Unknown upload", 404)
+        base = os.path.join(self.directory, upload_id)
+        return base + ".json", base + ".part"
+
+    def _load(self, upload_id: str) -> Dict[str, Any]:
+        meta_path, _ = self._paths(upload_id)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            raise UploadError("Unknown upload", 404)
+
+    def _save(self, meta: Dict[str, Any]) -> None:
+        meta_path, _ = self._paths(meta["upload_id"])
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def _status(self, meta: Dict[str, Any], offset: int) -> Dict[str, Any]:
+        return {
+            "upload_id": meta["upload_id"],
+            "kind": meta["kind"],
+            "filename": meta["filename"],
+            "size": meta["size"],
+            "offset": offset,
+            "chunk_size": self.max_chunk_size,
+            "complete": meta["complete"]
+        }
+
+    def create(self, filename: str, size: int, kind: str, checksum: Optional[str] = None) -> Dict[str, Any]:
+        if kind not in UPLOAD_KINDS:
+            raise UploadError(f"kind must be one of {', '.join(UPLOAD_KINDS)}")
+        if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+            raise UploadError("size must be a positive integer")
+        if size > self.max_upload_size:
+            raise UploadError("Upload too large", 413, max_upload_size=self.max_upload_size)
+        self.purge_expired()
+        meta = {
+            "upload_id": uuid.uuid4().hex,
+            "filename": os.path.basename(filename or "upload"),
+            "kind": kind,
+            "size": size,
+            "checksum": checksum.lower() if checksum else None,
+            "complete": False,
+            "created_at": time.time()
+        }
+        _, part_path = self._paths(meta["upload_id"])
+        open(part_path, "wb").close()
+        self._save(meta)
+        return self._status(meta, 0)
+
+    def status(self, upload_id: str) -> Dict[str, Any]:
+        meta = self._load(upload_id)
+        _, part_path = self._paths(upload_id)
+        return self._status(meta, os.path.getsize(part_path))
+
+    def write_chunk(self, upload_id: str, offset: int, stream: BinaryIO, length: int, checksum: str) -> Dict[str, Any]:
+        """Append one chunk read from ``stream`` at ``offset``; returns the new status."""
+        meta = self._load(upload_id)
+        if meta["complete"]:
+            raise UploadError("Upload already completed", 409)
+        if length <= 0 or length > self.max_chunk_size:
+            raise UploadError("Chunk too large or empty", 413, chunk_size=self.max_chunk_size)
+        if offset + length > meta["size"]:
+            raise UploadError("Chunk extends past the declared size")
+
+        chunk = bytearray()
+        while len(chunk) < length:
+            data = stream.read(min(_READ_SIZE, length - len(chunk)))
+            if not data:
+                break
+            chunk += data
+        if len(chunk) != length:
+            raise UploadError("Chunk body shorter than Content-Length")
+        if hashlib.sha256(chunk).hexdigest() != (checksum or "").lower():
+            raise UploadError("Chunk checksum mismatch", 422)
+
+        _, part_path = self._paths(upload_id)
+        with open(part_path, "r+b") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            current = os.fstat(f.fileno()).st_size
+            if offset != current:
+                raise UploadError("Offset does not match the uploaded size", 409, offset=current)
+            f.seek(offset)
+            f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        return self._status(meta, offset + length)
+
+    def complete(self, upload_id: str) -> Dict[str, Any]:
+        meta = self._load(upload_id)
+        _, part_path = self._paths(upload_id)
+        size = os.path.getsize(part_path)
+        if meta["complete"]:
+            return self._status(meta, size)
+        if size != meta["size"]:
+            raise UploadError("Upload is incomplete", 409, offset=size)
+        if meta["checksum"]:
+            hasher = hashlib.sha256()
+            with open(part_path, "rb") as f:
+                for block in iter(lambda: f.read(_READ_SIZE), b""):
+                    hasher.update(block)
+            if hasher.hexdigest() != meta["checksum"]:
+                raise UploadError("File checksum mismatch", 422)
+        meta["complete"] = True
+        self._save(meta)
+        return self._status(meta, size)
+
+    def path(self, upload_id: str, kind: Optional[str] = None) -> str:
+        """Filesystem path of a completed upload."""
+        meta = self._load(upload_id)
+        if not meta["complete"]:
+            raise UploadError("Upload is not complete", 409)
+        if kind and meta["kind"] != kind:
+            raise UploadError(f"Upload is not a {kind} upload")
+        return self._paths(upload_id)[1]
+
+    def open(self, upload_id: str, kind: Optional[str] = None) -> BinaryIO:
+        return open(self.path(upload_id, kind), "rb")
+
+    def delete(self, upload_id: str) -> None:
+        for path in self._paths(upload_id):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def purge_expired(self) -> None:
+        cutoff = time.time() - self.ttl
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".json"):
+                continue
+            upload_id = entry.name[:-len(".json")]
+            if not _UPLOAD_ID_RE.match(upload_id):
+                # Not one of ours; leave it alone rather than fail every create().
+                continue
+            part_path = os.path.join(self.directory, upload_id + ".part")
+            try:
+                last_activity = max(entry.stat().st_mtime, os.path.getmtime(part_path))
+            except OSError:
+                last_activity = entry.stat().st_mtime
+            if last_activity < cutoff:
+                self.delete(upload_id)
@@ -0,0 +1,21 @@
+"""
+MindFlow Jobs Module
+This module contains the SQLite-backed job queue and its local worker pool.
+"""
+
+from .store import CANCELLED, FAILED, FINISHED_STATES, QUEUED, RUNNING, SUCCEEDED, JobStore
+from .worker import JobCancelled, JobContext, JobWorkerPool, PermanentJobError
+
+__all__ = [
+    'CANCELLED',
+    'FAILED',
+    'FINISHED_STATES',
+    'QUEUED',
+    'RUNNING',
+    'SUCCEEDED',
+    'JobCancelled',
+    'JobContext',
+    'JobStore',
+    'JobWorkerPool',
+    'PermanentJobError'
+]
@@ -0,0 +1,207 @@
+"""SQLite-backed job table shared by web and worker processes."""
+
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+from typing import Any, Dict, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+_COLUMNS = (
+    "id", "kind", "payload", "status", "progress", "result", "error",
+    "attempts", "max_attempts", "cancel_requested",
+    "created_at", "updated_at", "available_at", "expires_at"
+)
+
+
+class JobStore:
+    """Persistent job queue with retry, cancellation and result expiry.
+
+    Every method opens its own short-lived connection, so a store can be
+    shared freely between threads and processes.
+    """
+
+    def __init__(self, path: str, result_ttl: float = 3600, lease_seconds: float = 600):
+        self.path = path
+        self.result_ttl = result_ttl
+        self.lease_seconds = lease_seconds
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, "
+                "status TEXT NOT NULL, progress TEXT, result TEXT, error TEXT, "
+                "attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, "
+                "cancel_requested INTEGER NOT NULL DEFAULT 0, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL, "
+                "available_at REAL NOT NULL, expires_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, available_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        for field in ("payload", "progress", "result"):
+            if job[field] is not None:
+                job[field] = json.loads(job[field])
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def submit(self, kind: str, payload: Dict[str, Any], max_attempts: int = 3) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, max_attempts, created_at, updated_at, available_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), QUEUED, max_attempts, now, now, now)
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        if row["expires_at"] is not None and row["expires_at"] < time.time():
+            return None
+        return self._to_dict(row)
+
+    def _recover_stale(self, conn: sqlite3.Connection, now: float) -> None:
+        """Settle jobs whose worker stopped heartbeating, re-queueing where allowed."""
+        stale = now - self.lease_seconds
+        expires = now + self.result_ttl
+        conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, expires_at = ? "
+            "WHERE status = ? AND updated_at < ? AND cancel_requested = 1",
+            (CANCELLED, "Cancelled", expires, RUNNING, stale)
+        )
+        conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, expires_at = ? "
+            "WHERE status = ? AND updated_at < ? AND attempts >= max_attempts",
+            (FAILED, "Worker stopped responding", expires, RUNNING, stale)
+        )
+        conn.execute(
+            "UPDATE jobs SET status = ?, available_at = ? WHERE status = ? AND updated_at < ?",
+            (QUEUED, now, RUNNING, stale)
+        )
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically move the oldest runnable job to ``running`` and return it."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._recover_stale(conn, now)
+                row = conn.execute(
+                    f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE status = ? AND available_at <= ? "
+                    "ORDER BY available_at LIMIT 1",
+                    (QUEUED, now)
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (RUNNING, now, row["id"])
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        job = self._to_dict(row)
+        job["status"] = RUNNING
+        job["attempts"] += 1
+        return job
+
+    def heartbeat(self, job_id: str, progress: Optional[Dict[str, Any]] = None) -> bool:
+        """Record progress; returns True if cancellation has been requested."""
+        with closing(self._connect()) as conn:
+            if progress is None:
+                conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time(), job_id))
+            else:
+                conn.execute(
+                    "UPDATE jobs SET progress = ?, updated_at = ? WHERE id = ?",
+                    (json.dumps(progress), time.time(), job_id)
+                )
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def _finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ?, expires_at = ? WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, now, now + self.result_ttl, job_id)
+            )
+
+    def complete(self, job_id: str, result: Any) -> None:
+        self._finish(job_id, SUCCEEDED, result=result)
+
+    def fail(self, job_id: str, error: str, retry_delay: Optional[float] = None) -> None:
+        """Fail the current attempt, re-queueing the job if attempts remain."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT attempts, max_attempts, cancel_requested FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if (
+                row is not None
+                and retry_delay is not None
+                and not row["cancel_requested"]
+                and row["attempts"] < row["max_attempts"]
+            ):
+                now = time.time()
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, updated_at = ?, available_at = ? WHERE id = ?",
+                    (QUEUED, error, now, now + retry_delay, job_id)
+                )
+                return
+        self._finish(job_id, FAILED, error=error)
+
+    def mark_cancelled(self, job_id: str) -> None:
+        self._finish(job_id, CANCELLED, error="Cancelled")
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued job now, or ask the worker running it to stop."""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE id = ? AND status IN (?, ?)",
+                (time.time(), job_id, QUEUED, RUNNING)
+            )
+            if not cursor.rowcount:
+                return False
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, expires_at = ? WHERE id = ? AND status = ?",
+                (CANCELLED, "Cancelled", now + self.result_ttl, job_id, QUEUED)
+            )
+        return True
+
+    def purge_expired(self) -> int:
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),)
+            )
+        return cursor.rowcount
+
+    def queue_depth(self) -> int:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()
+        return row[0]
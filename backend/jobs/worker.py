@@ -0,0 +1,131 @@
+"""Thread pool that executes jobs from a :class:`JobStore`."""
+
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, List, Optional
+
+from .store import JobStore
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when the job has been cancelled."""
+
+
+class PermanentJobError(Exception):
+    """A failure that retrying cannot fix, such as invalid input."""
+
+
+class JobContext:
+    """Handed to job handlers for progress reporting and cancellation checks."""
+
+    def __init__(self, store: JobStore, job: Dict[str, Any], min_interval: float = 0.5):
+        self.store = store
+        self.job = job
+        self.min_interval = min_interval
+        self._last_report = 0.0
+
+    @property
+    def job_id(self) -> str:
+        return self.job["id"]
+
+    def report(self, force: bool = False, **progress: Any) -> None:
+        """Persist progress (throttled) and raise :class:`JobCancelled` if requested."""
+        now = time.monotonic()
+        if not force and now - self._last_report < self.min_interval:
+            return
+        self._last_report = now
+        if self.store.heartbeat(self.job_id, progress or None):
+            raise JobCancelled()
+
+
+JobHandler = Callable[[Dict[str, Any], JobContext], Any]
+
+
+class JobWorkerPool:
+    """Poll the store from ``workers`` threads and run registered handlers.
+
+    A handler returns a JSON-serialisable result. Raising
+    :class:`PermanentJobError` fails the job immediately; any other exception
+    is retried with exponential backoff until ``max_attempts`` is reached.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        handlers: Dict[str, JobHandler],
+        workers: int = 2,
+        poll_interval: float = 0.5,
+        retry_base_delay: float = 2.0,
+        purge_interval: float = 60.0
+    ):
+        self.store = store
+        self.handlers = handlers
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.retry_base_delay = retry_base_delay
+        self.purge_interval = purge_interval
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._last_purge = 0.0
+        self._purge_lock = threading.Lock()
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def run_forever(self) -> None:
+        self.start()
+        try:
+            while not self._stop.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            self.stop()
+
+    def _maybe_purge(self) -> None:
+        with self._purge_lock:
+            now = time.monotonic()
+            if now - self._last_purge < self.purge_interval:
+                return
+            self._last_purge = now
+        self.store.purge_expired()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._maybe_purge()
+                job = self.store.claim()
+            except Exception:
+                traceback.print_exc()
+                job = None
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            self.run_job(job)
+
+    def run_job(self, job: Dict[str, Any]) -> None:
+        handler = self.handlers.get(job["kind"])
+        if handler is None:
+            self.store.fail(job["id"], f"No handler for job kind '{job['kind']}'")
+            return
+        context = JobContext(self.store, job)
+        try:
+            result = handler(job["payload"], context)
+        except JobCancelled:
+            self.store.mark_cancelled(job["id"])
+        except PermanentJobError as e:
+            self.store.fail(job["id"], str(e))
+        except Exception as e:
+            traceback.print_exc()
+            delay = self.retry_base_delay * (2 ** (job["attempts"] - 1))
+            self.store.fail(job["id"], str(e), retry_delay=delay)
+        else:
+            self.store.complete(job["id"], result)
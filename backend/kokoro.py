@@ -1,17 +1,118 @@
 # kokoro.py
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import io
+import logging
+import time
+
 from gtts import gTTS
-import numpy as np
-import tempfile
-import soundfile as sf
+
+from metrics import SPEECH_CACHE_WRITE_ERRORS, TTS_AUDIO_SECONDS, TTS_REAL_TIME_FACTOR, TTS_SEGMENTS
+from speech.decode import decode_mono, resample
+from speech.segment import split_segments
+from speech.tts_cache import segment_key
+
+logger = logging.getLogger(__name__)
+
+# Kokoro language codes mapped to gTTS (lang, tld).
+LANG_CODES = {
+    'a': ('en', 'com'),
+    'b': ('en', 'co.uk'),
+    'e': ('es', 'es'),
+    'f': ('fr', 'fr'),
+    'h': ('hi', 'co.in'),
+    'i': ('it', 'it'),
+    'j': ('ja', 'co.jp'),
+    'p': ('pt', 'com.br'),
+    'z': ('zh-CN', 'com'),
+}
 
 class KPipeline:
-    def __init__(self, lang_code='en'):
-        self.lang = lang_code
+    """gTTS-backed stand-in for kokoro's KPipeline.
+
+    Text is split into sentence groups that are synthesized concurrently on
+    a bounded thread pool. Segments are yielded in order as soon as every
+    earlier segment is ready, and a failing segment is retried on its own.
+    With a ``cache`` (see ``speech.tts_cache.SegmentAudioCache``), segments
+    already synthesized with the same voice and speed are not requested again.
+    Every segment is returned as mono float32 at ``sample_rate``.
+    """
+
+    def __init__(self, lang_code='en', max_workers=4, max_retries=2, retry_delay=0.5, synthesize=None, cache=None,
+                 sample_rate=24000):
+        self.sample_rate = sample_rate
+        self.lang_code = lang_code
+        self.lang, self.tld = LANG_CODES.get(lang_code, (lang_code, 'com'))
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.synthesize = synthesize or self._synthesize_gtts
+        self.cache = cache
+
+    def _synthesize_gtts(self, text, voice=None, speed=1):
+        tts = gTTS(text=text, lang=self.lang, tld=self.tld, slow=speed < 1)
+        buffer = io.BytesIO()
+        tts.write_to_fp(buffer)
+        return decode_mono(buffer.getvalue(), self.sample_rate)
+
+    def _synthesize_segment(self, text, voice, speed):
+        if self.cache is None:
+            return self._synthesize_timed(text, voice, speed)
+        key = segment_key(text, voice, speed, self.lang_code)
+        cached = self.cache.get(key)
+        if cached is not None:
+            audio, cached_rate = cached
+            TTS_SEGMENTS.inc(source="cache")
+            TTS_AUDIO_SECONDS.inc(len(audio) / cached_rate, source="cache")
+            return resample(audio, cached_rate, self.sample_rate)
+        audio = self._synthesize_timed(text, voice, speed)
+        try:
+            self.cache.put(key, audio, self.sample_rate)
+        except Exception:
+            # The audio is still returned; only later requests miss the cache.
+            logger.warning("Could not write TTS segment %s to the cache", key, exc_info=True)
+            SPEECH_CACHE_WRITE_ERRORS.inc(cache="tts")
+        return audio
+
+    def _synthesize_timed(self, text, voice, speed):
+        started = time.perf_counter()
+        audio = self._synthesize_with_retries(text, voice, speed)
+        audio_seconds = len(audio) / self.sample_rate
+        TTS_SEGMENTS.inc(source="synthesized")
+        TTS_AUDIO_SECONDS.inc(audio_seconds, source="synthesized")
+        if audio_seconds:
+            TTS_REAL_TIME_FACTOR.observe((time.perf_counter() - started) / audio_seconds)
+        return audio
+
+    def _synthesize_with_retries(self, text, voice, speed):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.synthesize(text, voice=voice, speed=speed)
+            except Exception:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self.retry_delay * (2 ** attempt))
 
     def __call__(self, text, voice=None, speed=1):
-        tts = gTTS(text=text, lang=self.lang, slow=False)
-        with tempfile.NamedTemporaryFile(delete=True, suffix=".mp3") as f:
-            tts.save(f.name)
-            data, samplerate = sf.read(f.name)
-            yield "placeholder", "params", data
+        segments = iter(split_segments(text))
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        pending = deque()
+        try:
+            # Keep at most max_workers segments in flight or waiting to be
+            # yielded, so memory stays bounded however long the text is.
+            for segment in segments:
+                pending.append((segment, executor.submit(self._synthesize_segment, segment, voice, speed)))
+                if len(pending) >= self.max_workers:
+                    break
+            while pending:
+                segment, future = pending.popleft()
+                audio = future.result()
+                next_segment = next(segments, None)
+                if next_segment is not None:
+                    pending.append((next_segment, executor.submit(self._synthesize_segment, next_segment, voice, speed)))
+                yield segment, "params", audio
+        finally:
+            for _, future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
@@ -0,0 +1,254 @@
+"""Process-local metrics rendered in the Prometheus text exposition format.
+
+Counters and histograms are dicts keyed by label values, each guarded by its
+own lock, so an update on the request path costs a lock, a dict lookup and an
+add (plus a bisect for histograms). Queue depths are gauges that call a
+function at scrape time instead of being updated as the queues change.
+
+Every process keeps its own values and nothing is shared between them. A
+scrape of ``/metrics`` is answered by whichever gunicorn worker accepts it,
+so counters are only consistent from one scrape to the next with a single
+web worker (the Procfile's default; it scales with threads instead) or when
+each worker is scraped as its own target. The job worker exports nothing.
+
+The model server owns the Whisper and TTS families (``MODEL_SERVER_FAMILIES``)
+and renders only those; a web process using it leaves them out of its own
+output and appends the model server's, so every family appears once.
+Families with no samples yet are left out of the output.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+REAL_TIME_FACTOR_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 5.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16)
+
+_METRICS: List["_Metric"] = []
+_REGISTRY_LOCK = threading.Lock()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        with _REGISTRY_LOCK:
+            if any(metric.name == name for metric in _METRICS):
+                raise ValueError(f"Metric already registered: {name}")
+            _METRICS.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple([labels[name] for name in self.labelnames])
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        samples = self.samples()
+        if not samples:
+            return ""
+        return f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n" + "\n".join(samples) + "\n"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_label_text(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(_Metric):
+    """A value that is set directly, or read from ``function`` at scrape time (unlabelled gauges only)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], Optional[float]]] = None
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function: Callable[[], Optional[float]]) -> None:
+        """Read the value from ``function`` at scrape time; returning ``None`` omits the sample."""
+        if self.labelnames:
+            raise ValueError("Only unlabelled gauges can be read from a function")
+        self._function = function
+
+    def samples(self) -> List[str]:
+        if self._function is not None:
+            try:
+                value = self._function()
+            except Exception:
+                value = None
+            return [] if value is None else [f"{self.name} {_format_value(value)}"]
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_label_text(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        if "le" in labelnames:
+            raise ValueError("'le' is reserved for histogram buckets")
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket..., count above the last bucket, sum].
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = [(key, list(counts)) for key, counts in self._values.items()]
+        lines = []
+        for key, counts in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {_format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+def render(include: Optional[Iterable[str]] = None, exclude: Iterable[str] = ()) -> str:
+    """Render every family, only those named in ``include``, minus those in ``exclude``."""
+    include = None if include is None else set(include)
+    exclude = set(exclude)
+    with _REGISTRY_LOCK:
+        metrics = list(_METRICS)
+    return "".join(
+        metric.render() for metric in metrics
+        if (include is None or metric.name in include) and metric.name not in exclude
+    )
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "mindflow_http_request_duration_seconds",
+    "Time until the response headers were ready, by route template, method and status.",
+    ("route", "method", "status")
+)
+LLM_CALLS = Counter(
+    "mindflow_llm_calls_total", "LLM calls by provider, model, agent and outcome.",
+    ("provider", "model", "agent", "outcome")
+)
+LLM_CALL_SECONDS = Histogram(
+    "mindflow_llm_call_duration_seconds", "LLM call latency including retries.",
+    ("provider", "model", "agent")
+)
+LLM_RETRIES = Counter(
+    "mindflow_llm_retries_total", "LLM request attempts that were retried, by reason.",
+    ("provider", "model", "reason")
+)
+LLM_RATE_LIMITED = Counter(
+    "mindflow_llm_rate_limited_total", "HTTP 429 responses from LLM providers.", ("provider", "model")
+)
+PDF_PAGES = Counter("mindflow_pdf_pages_total", "PDF pages parsed, by parser.", ("parser",))
+PDF_PARSE_SECONDS = Counter(
+    "mindflow_pdf_parse_seconds_total",
+    "Seconds spent extracting page text; pages per second is the ratio of the two rates.",
+    ("parser",)
+)
+TTS_SEGMENTS = Counter("mindflow_tts_segments_total", "TTS segments produced, by source.", ("source",))
+TTS_AUDIO_SECONDS = Counter("mindflow_tts_audio_seconds_total", "Seconds of audio produced by TTS.", ("source",))
+TTS_REAL_TIME_FACTOR = Histogram(
+    "mindflow_tts_real_time_factor", "Synthesis seconds per second of audio for segments not served from the cache.",
+    buckets=REAL_TIME_FACTOR_BUCKETS
+)
+STT_AUDIO_SECONDS = Counter("mindflow_stt_audio_seconds_total", "Seconds of audio transcribed by Whisper.")
+STT_REAL_TIME_FACTOR = Histogram(
+    "mindflow_stt_real_time_factor", "Whisper inference seconds per second of audio, per batch.",
+    buckets=REAL_TIME_FACTOR_BUCKETS
+)
+STT_BATCH_SIZE = Histogram("mindflow_stt_batch_size", "Requests decoded per Whisper forward pass.", buckets=BATCH_SIZE_BUCKETS)
+STT_QUEUE_DEPTH = Gauge("mindflow_stt_queue_depth", "Transcription requests waiting for the model.")
+JOB_QUEUE_DEPTH = Gauge("mindflow_job_queue_depth", "Background jobs waiting for a worker.")
+LIVE_STREAMS = Gauge("mindflow_live_transcription_streams", "Open live transcription streams in this process.")
+TTS_ACTIVE_JOBS = Gauge("mindflow_tts_active_jobs", "Synthesis jobs running in the model server.")
+CACHE_HITS = Counter("mindflow_cache_hits_total", "Document cache lookups that found an entry, by cache.", ("cache",))
+CACHE_MISSES = Counter("mindflow_cache_misses_total", "Document cache lookups that found nothing, by cache.", ("cache",))
+SPEECH_CACHE_HITS = Counter(
+    "mindflow_speech_cache_hits_total", "Transcript and TTS segment cache lookups that found an entry, by cache.",
+    ("cache",)
+)
+SPEECH_CACHE_MISSES = Counter(
+    "mindflow_speech_cache_misses_total", "Transcript and TTS segment cache lookups that found nothing, by cache.",
+    ("cache",)
+)
+SPEECH_CACHE_WRITE_ERRORS = Counter(
+    "mindflow_speech_cache_write_errors_total", "Results that could not be written to a speech cache, by cache.",
+    ("cache",)
+)
+
+MODEL_SERVER_FAMILIES = frozenset(metric.name for metric in (
+    TTS_SEGMENTS, TTS_AUDIO_SECONDS, TTS_REAL_TIME_FACTOR, STT_AUDIO_SECONDS, STT_REAL_TIME_FACTOR,
+    STT_BATCH_SIZE, STT_QUEUE_DEPTH, TTS_ACTIVE_JOBS, SPEECH_CACHE_HITS, SPEECH_CACHE_MISSES,
+    SPEECH_CACHE_WRITE_ERRORS
+))
+
+
+def record_llm_call(provider: str, model: str, agent: str, outcome: str, started: float) -> None:
+    """Count one LLM call that began at ``started`` (a ``time.perf_counter()`` value)."""
+    LLM_CALLS.inc(provider=provider, model=model, agent=agent, outcome=outcome)
+    LLM_CALL_SECONDS.observe(time.perf_counter() - started, provider=provider, model=model, agent=agent)
@@ -0,0 +1,27 @@
+"""Serves Whisper and TTS to the web workers over a Unix socket: python model_server.py
+
+Start it with the same MODEL_SERVER_SOCKET as the web processes. Subsystems
+listed in MINDFLOW_DISABLED_SUBSYSTEMS are not loaded here either.
+"""
+
+import os
+import sys
+
+from services import build_pipeline, build_stt_model, build_transcription_service, services
+from speech import ModelServer
+
+if __name__ == "__main__":
+    socket_path = os.getenv("MODEL_SERVER_SOCKET")
+    if not socket_path:
+        sys.exit("Set MODEL_SERVER_SOCKET to the Unix socket path shared with the web workers")
+    transcription_service = build_transcription_service(build_stt_model()) if services.enabled('stt') else None
+    server = ModelServer(
+        socket_path,
+        transcription_service=transcription_service,
+        pipeline=build_pipeline() if services.enabled('tts') else None,
+        max_synthesis=int(os.getenv("TTS_MAX_JOBS", "2")),
+        synthesis_wait=float(os.getenv("TTS_QUEUE_TIMEOUT", "30"))
+    )
+    if transcription_service is not None and os.getenv("WHISPER_WARMUP", "").lower() in ("1", "true", "yes"):
+        transcription_service.warm_up()
+    server.serve_forever()
@@ -0,0 +1,207 @@
+"""Opt-in sampling profiler for live requests, writing flamegraph-ready collapsed stacks.
+
+Nothing here is active unless a profiling token is configured: without one,
+:func:`init_profiling` registers no hooks or routes, so requests pay nothing.
+With a token:
+
+- any request sent with ``X-Profile-Token: <token>`` is sampled on its own
+  thread until its response body is closed (streamed bodies included); the
+  response carries ``X-Profile-Id``;
+- ``POST /debug/profile?seconds=N`` starts sampling every thread of the
+  worker that receives it for N seconds in the background (so that worker
+  keeps serving the traffic being profiled) and returns the profile id;
+- ``GET /debug/profiles`` and ``GET /debug/profiles/<id>`` list and fetch
+  stored profiles.
+
+Profiles use the collapsed-stack format (``frame;frame;frame count`` per
+line), which flamegraph.pl, inferno and speedscope read directly. Samples
+are taken from ``sys._current_frames()`` every ``interval`` seconds by a
+background thread, so the profiled code runs unmodified.
+"""
+
+import hmac
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+from flask import Flask, Response, abort, g, jsonify, request
+
+MAX_PROFILE_SECONDS = 60.0
+PROFILING_ENDPOINTS = ("profile_process", "list_profiles", "get_profile")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Count the stacks of some or all threads, sampled every ``interval`` seconds."""
+
+    def __init__(self, interval: float = 0.005, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self, own_id: int) -> None:
+        frames = sys._current_frames()
+        if self.thread_id is not None:
+            items = [(self.thread_id, frames.get(self.thread_id))]
+        else:
+            items = [(ident, frame) for ident, frame in frames.items() if ident != own_id]
+        names = None if self.thread_id is not None else {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in items:
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if names is not None:
+                stack.append(names.get(ident, f"thread-{ident}"))
+            self.counts[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self, seconds: Optional[float], on_done: Optional[Callable[["StackSampler"], None]]) -> None:
+        own_id = threading.get_ident()
+        deadline = None if seconds is None else time.monotonic() + seconds
+        while not self._stop.wait(self.interval):
+            self._sample(own_id)
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+        if on_done is not None:
+            on_done(self.stop())
+
+    def start(self, seconds: Optional[float] = None,
+              on_done: Optional[Callable[["StackSampler"], None]] = None) -> "StackSampler":
+        """Start sampling until :meth:`stop`, or for ``seconds`` and then call ``on_done``."""
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, args=(seconds, on_done), name="profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "StackSampler":
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.duration = time.time() - self.started_at
+        return self
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+
+class ProfileStore:
+    """Collapsed-stack files in ``directory``, keeping the newest ``max_profiles``."""
+
+    def __init__(self, directory: str, max_profiles: int = 200):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def new_id() -> str:
+        return time.strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:8]
+
+    def save(self, label: str, sampler: StackSampler, profile_id: Optional[str] = None) -> str:
+        profile_id = profile_id or self.new_id()
+        header = f"# {label} samples={sampler.samples} seconds={sampler.duration:.3f} interval={sampler.interval}\n"
+        path = os.path.join(self.directory, profile_id + ".folded")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(header + sampler.collapsed())
+        os.replace(path + ".tmp", path)
+        self._prune()
+        return profile_id
+
+    def _prune(self) -> None:
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith(".folded"))
+        for name in names[:-self.max_profiles]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def list(self) -> List[Dict[str, str]]:
+        profiles = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if name.endswith(".folded"):
+                with open(os.path.join(self.directory, name), "r", encoding="utf-8") as f:
+                    profiles.append({"id": name[:-len(".folded")], "summary": f.readline()[2:].strip()})
+        return profiles
+
+    def path(self, profile_id: str) -> Optional[str]:
+        if not profile_id or os.path.basename(profile_id) != profile_id:
+            return None
+        path = os.path.join(self.directory, profile_id + ".folded")
+        return path if os.path.exists(path) else None
+
+
+def init_profiling(app: Flask, token: Optional[str], directory: str, interval: float = 0.005) -> Optional[ProfileStore]:
+    """Register the profiling hooks and routes on ``app`` when ``token`` is set."""
+    if not token:
+        return None
+    store = ProfileStore(directory)
+
+    def authorized() -> bool:
+        supplied = request.headers.get("X-Profile-Token") or request.args.get("profile_token") or ""
+        return hmac.compare_digest(supplied.encode("utf-8"), token.encode("utf-8"))
+
+    @app.before_request
+    def start_request_profile():
+        if ("X-Profile-Token" in request.headers and request.endpoint not in PROFILING_ENDPOINTS
+                and authorized()):
+            g.profiler = StackSampler(interval, thread_id=threading.get_ident()).start()
+
+    @app.after_request
+    def finish_request_profile(response):
+        sampler = g.pop("profiler", None)
+        if sampler is None:
+            return response
+        label = f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"
+        profile_id = store.new_id()
+        response.headers["X-Profile-Id"] = profile_id
+        # Stop only once the body has been sent, so streamed responses are covered.
+        response.call_on_close(lambda: store.save(label, sampler.stop(), profile_id))
+        return response
+
+    @app.route("/debug/profile", methods=["POST"], endpoint="profile_process")
+    def profile_process():
+        if not authorized():
+            abort(404)
+        seconds = min(max(request.args.get("seconds", 10.0, type=float), 0.1), MAX_PROFILE_SECONDS)
+        profile_id = store.new_id()
+        label = f"process pid={os.getpid()}"
+        StackSampler(interval=max(request.args.get("interval", interval, type=float), 0.001)).start(
+            seconds, on_done=lambda sampler: store.save(label, sampler, profile_id)
+        )
+        return jsonify({
+            'profile_id': profile_id,
+            'pid': os.getpid(),
+            'seconds': seconds,
+            'url': f"/debug/profiles/{profile_id}"
+        }), 202
+
+    @app.route("/debug/profiles", methods=["GET"], endpoint="list_profiles")
+    def list_profiles():
+        if not authorized():
+            abort(404)
+        return jsonify(store.list())
+
+    @app.route("/debug/profiles/<profile_id>", methods=["GET"], endpoint="get_profile")
+    def get_profile(profile_id):
+        path = store.path(profile_id) if authorized() else None
+        if path is None:
+            abort(404)
+        with open(path, "r", encoding="utf-8") as f:
+            return Response(f.read(), mimetype="text/plain")
+
+    return store
@@ -0,0 +1,14 @@
+"""
+MindFlow Retrieval Module
+This module contains the lexical and hybrid retrievers used over document chunks.
+"""
+
+from .bm25 import BM25Index, tokenize
+from .hybrid import HybridRetriever, reciprocal_rank_fusion
+
+__all__ = [
+    'BM25Index',
+    'HybridRetriever',
+    'reciprocal_rank_fusion',
+    'tokenize'
+]
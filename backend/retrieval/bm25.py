@@ -0,0 +1,184 @@
+"""BM25 inverted index over document chunks."""
+
+import math
+import re
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"\w+(?:\.\w+)*")
+_PART_RE = re.compile(r"[._]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase terms, keeping dotted and snake_case identifiers whole."""
+    tokens = []
+    for match in _TOKEN_RE.finditer(text.lower()):
+        token = match.group()
+        tokens.append(token)
+        if '.' in token or '_' in token:
+            tokens.extend(part for part in _PART_RE.split(token) if part)
+    return tokens
+
+
+class BM25Index:
+    """Compact inverted index with Okapi BM25 scoring.
+
+    Postings are stored per term as two parallel ``array`` objects (document
+    ids and term frequencies). Documents can be added at any time; ids are
+    assigned in insertion order so postings stay sorted without re-indexing.
+
+    Adding a document appends its length norm computed against the average
+    length the other norms use; all norms are recomputed only once the
+    average has drifted by more than ``norm_tolerance``. Queries score whole
+    posting lists with numpy. Terms in more than ``max_df_ratio`` of the
+    documents are scored only against the documents the rarer query terms
+    found, when no document matching common terms alone could reach the top
+    ``k`` (their upper bound is below the ``k``-th candidate score), so
+    results are the same as a full scan.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, max_df_ratio: Optional[float] = 0.1,
+                 norm_tolerance: float = 0.05):
+        self.k1 = k1
+        self.b = b
+        self.max_df_ratio = max_df_ratio
+        self.norm_tolerance = norm_tolerance
+        self._vocab: Dict[str, int] = {}
+        self._postings_docs: List[array] = []
+        self._postings_tfs: List[array] = []
+        self._doc_lengths = array('I')
+        self._total_length = 0
+        self._documents: List[str] = []
+        self._metadata: List[Any] = []
+        self._ids_by_text: Dict[str, int] = {}
+        self._norms = array('d')
+        self._norm_avg_length = 0.0
+        # Per term: (doc ids, tf / (tf + norm) per posting, largest of those).
+        self._term_cache: Dict[int, Tuple[np.ndarray, np.ndarray, float]] = {}
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[str], **kwargs) -> 'BM25Index':
+        """Build an index from chunks such as those returned by ``split_text_for_rag``."""
+        index = cls(**kwargs)
+        index.add_documents(chunks)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self._vocab)
+
+    def add(self, text: str, metadata: Any = None) -> int:
+        """Index a single document and return its id."""
+        doc_id = len(self._documents)
+        counts = Counter(tokenize(text))
+        for term, tf in counts.items():
+            term_id = self._vocab.get(term)
+            if term_id is None:
+                term_id = len(self._postings_docs)
+                self._vocab[term] = term_id
+                self._postings_docs.append(array('I'))
+                self._postings_tfs.append(array('I'))
+            else:
+                self._term_cache.pop(term_id, None)
+            self._postings_docs[term_id].append(doc_id)
+            self._postings_tfs[term_id].append(tf)
+
+        length = sum(counts.values())
+        self._doc_lengths.append(length)
+        self._total_length += length
+        self._documents.append(text)
+        self._metadata.append(metadata)
+        self._ids_by_text.setdefault(text, doc_id)
+        self._norms.append(self._norm(length, self._norm_avg_length))
+        return doc_id
+
+    def add_documents(self, texts: Iterable[str], metadata: Optional[Iterable[Any]] = None) -> List[int]:
+        """Index several documents and return their ids."""
+        if metadata is None:
+            return [self.add(text) for text in texts]
+        return [self.add(text, meta) for text, meta in zip(texts, metadata)]
+
+    def get(self, doc_id: int) -> str:
+        return self._documents[doc_id]
+
+    def get_metadata(self, doc_id: int) -> Any:
+        return self._metadata[doc_id]
+
+    def find(self, text: str) -> Optional[int]:
+        """Return the id of a document with exactly this text, if indexed."""
+        return self._ids_by_text.get(text)
+
+    def _norm(self, length: int, avg_length: float) -> float:
+        return self.k1 * (1 - self.b + self.b * length / (avg_length or 1.0))
+
+    def _check_norms(self) -> None:
+        avg_length = (self._total_length / len(self._doc_lengths)) or 1.0
+        if abs(avg_length - self._norm_avg_length) <= self.norm_tolerance * avg_length:
+            return
+        lengths = np.frombuffer(self._doc_lengths, dtype=np.uint32)
+        norms = self.k1 * (1 - self.b + self.b * lengths / avg_length)
+        self._norms = array('d', norms.tobytes())
+        self._norm_avg_length = avg_length
+        self._term_cache.clear()
+
+    def _term(self, term_id: int) -> Tuple[np.ndarray, np.ndarray, float]:
+        cached = self._term_cache.get(term_id)
+        if cached is None:
+            docs = np.frombuffer(self._postings_docs[term_id], dtype=np.uint32).astype(np.intp)
+            tfs = np.frombuffer(self._postings_tfs[term_id], dtype=np.uint32).astype(np.float64)
+            parts = tfs / (tfs + np.frombuffer(self._norms, dtype=np.float64)[docs])
+            cached = self._term_cache[term_id] = (docs, parts, float(parts.max()))
+        return cached
+
+    def _weight(self, term_id: int) -> float:
+        df = len(self._postings_docs[term_id])
+        return math.log(1 + (len(self._documents) - df + 0.5) / (df + 0.5)) * (self.k1 + 1)
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[int, float]]:
+        """Return up to ``k`` ``(doc_id, score)`` pairs, best first."""
+        if not self._documents or k <= 0:
+            return []
+        term_ids = {self._vocab[term] for term in tokenize(query) if term in self._vocab}
+        if not term_ids:
+            return []
+        self._check_norms()
+        ordered = sorted(term_ids, key=lambda term_id: len(self._postings_docs[term_id]))
+        max_df = len(self._documents) if self.max_df_ratio is None else self.max_df_ratio * len(self._documents)
+        rare = [term_id for term_id in ordered if len(self._postings_docs[term_id]) <= max_df] or ordered[:1]
+        common = ordered[len(rare):]
+
+        scores = np.zeros(len(self._documents))
+        for term_id in rare:
+            docs, parts, _ = self._term(term_id)
+            scores[docs] += self._weight(term_id) * parts
+        candidates = None
+        if common:
+            found = np.flatnonzero(scores)
+            bound = sum(self._weight(term_id) * self._term(term_id)[2] for term_id in common)
+            if len(found) >= k and np.partition(scores[found], len(found) - k)[len(found) - k] >= bound:
+                candidates = found
+        for term_id in common:
+            docs, parts, _ = self._term(term_id)
+            weight = self._weight(term_id)
+            if candidates is None:
+                scores[docs] += weight * parts
+                continue
+            positions = np.minimum(np.searchsorted(docs, candidates), len(docs) - 1)
+            hit = docs[positions] == candidates
+            scores[candidates[hit]] += weight * parts[positions[hit]]
+
+        matched = np.flatnonzero(scores) if candidates is None else candidates
+        if len(matched) > k:
+            matched = matched[np.argpartition(scores[matched], len(matched) - k)[len(matched) - k:]]
+        best = matched[np.lexsort((matched, -scores[matched]))]
+        return [(int(doc_id), float(scores[doc_id])) for doc_id in best]
+
+    def search_texts(self, query: str, k: int = 5) -> List[str]:
+        """Return the text of the top ``k`` matching documents."""
+        return [self._documents[doc_id] for doc_id, _ in self.search(query, k)]
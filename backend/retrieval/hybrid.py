@@ -0,0 +1,68 @@
+"""Hybrid retrieval that fuses BM25 with a dense retriever."""
+
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from .bm25 import BM25Index
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[Hashable]],
+    k: int = 60,
+    weights: Optional[Sequence[float]] = None
+) -> List[Tuple[Hashable, float]]:
+    """Fuse several ranked lists with weighted reciprocal rank fusion."""
+    weights = weights or [1.0] * len(rankings)
+    fused: Dict[Hashable, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, key in enumerate(ranking):
+            fused[key] = fused.get(key, 0.0) + weight / (k + rank + 1)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+class HybridRetriever:
+    """Combine a :class:`BM25Index` with any dense retriever.
+
+    ``dense_search`` is called as ``dense_search(query, k)`` and may return
+    document ids, chunk texts, LangChain ``Document`` objects, or
+    ``(item, score)`` tuples of any of those. Texts are mapped back to the
+    lexical index ids; results that cannot be mapped are ignored.
+    """
+
+    def __init__(
+        self,
+        lexical: BM25Index,
+        dense_search: Callable[[str, int], Sequence[Any]],
+        rrf_k: int = 60,
+        lexical_weight: float = 1.0,
+        dense_weight: float = 1.0,
+        candidates: int = 20
+    ):
+        self.lexical = lexical
+        self.dense_search = dense_search
+        self.rrf_k = rrf_k
+        self.weights = (lexical_weight, dense_weight)
+        self.candidates = candidates
+
+    def _resolve(self, item: Any) -> Optional[int]:
+        if isinstance(item, tuple):
+            item = item[0]
+        if isinstance(item, int):
+            return item if 0 <= item < len(self.lexical) else None
+        text = getattr(item, 'page_content', item)
+        if isinstance(text, str):
+            return self.lexical.find(text)
+        return None
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[int, float]]:
+        """Return up to ``k`` ``(doc_id, fused_score)`` pairs, best first."""
+        lexical_ids = [doc_id for doc_id, _ in self.lexical.search(query, self.candidates)]
+        dense_ids = []
+        for item in self.dense_search(query, self.candidates) or []:
+            doc_id = self._resolve(item)
+            if doc_id is not None:
+                dense_ids.append(doc_id)
+        fused = reciprocal_rank_fusion([lexical_ids, dense_ids], k=self.rrf_k, weights=self.weights)
+        return fused[:k]
+
+    def search_texts(self, query: str, k: int = 5) -> List[str]:
+        return [self.lexical.get(doc_id) for doc_id, _ in self.search(query, k)]
@@ -0,0 +1,394 @@
+"""Shared services for the web app, the job worker and the model server.
+
+Everything here can be imported without building the Flask app, so
+``worker.py`` and ``model_server.py`` get the subsystem registry, the job
+handlers and the model builders without the routes, in-process job workers,
+preloading or web metrics that :func:`app.create_app` sets up.
+"""
+
+import importlib
+import os
+import threading
+import time
+
+import requests
+from dotenv import load_dotenv
+
+from ingestion import (CleaningStats, DownloadError, IngestionError, PipelineStats, RemoteDocumentFetcher,
+                       StreamingSummarizer, TextCache, UrlMetadataCache, drop_near_duplicates, iter_chunks,
+                       iter_pdf_pages)
+from jobs import JobStore, PermanentJobError
+from metrics import LLM_RATE_LIMITED, LLM_RETRIES, record_llm_call
+from speech import (AudiobookError, AudiobookStore, LiveTranscriptionRegistry, ModelServerClient,
+                    RemoteSpeechPipeline, RemoteTranscriptionService, RemoteWhisperModel, SegmentAudioCache,
+                    TranscriptCache, TranscriptionService, WhisperModelLoader, iter_encoded_stream)
+from subsystems import Subsystems, parse_subsystem_list
+
+load_dotenv()
+
+api_key = os.getenv("GEMINI_API_KEY")
+github_token = os.getenv("GITHUB_TOKEN")
+
+CACHE_DIR = os.getenv("MINDFLOW_CACHE_DIR", "cache")
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
+# Heavy subsystems are built on first use (see subsystems.py) and can be
+# switched off per process, e.g. MINDFLOW_DISABLED_SUBSYSTEMS=stt,tts for
+# workers that only serve the agent and content routes.
+services = Subsystems(disabled=parse_subsystem_list(os.getenv("MINDFLOW_DISABLED_SUBSYSTEMS")))
+
+# With MODEL_SERVER_SOCKET set, Whisper and TTS run once in the model server
+# sidecar (python model_server.py) instead of in every web worker.
+MODEL_SERVER_SOCKET = os.getenv("MODEL_SERVER_SOCKET")
+model_server = ModelServerClient(MODEL_SERVER_SOCKET) if MODEL_SERVER_SOCKET else None
+
+def build_pipeline():
+    from kokoro import KPipeline
+    tts_cache = SegmentAudioCache(
+        os.path.join(CACHE_DIR, "tts"),
+        max_bytes=int(os.getenv("TTS_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+    )
+    return KPipeline(lang_code='a', max_workers=int(os.getenv("TTS_WORKERS", "4")), cache=tts_cache)
+
+@services.provider('tts', name='pipeline')
+def create_pipeline():
+    return RemoteSpeechPipeline(model_server) if model_server else build_pipeline()
+
+@services.provider('llm', name='openai_client')
+def create_openai_client():
+    if not github_token:
+        return None
+    from openai import OpenAI
+    return OpenAI(
+        base_url="https://models.github.ai/inference",
+        api_key=github_token,
+    )
+
+@services.provider('llm', name='agent_service')
+def create_agent_service():
+    from agents import AgentService
+    return AgentService(api_key=GEMINI_API_KEY)
+
+@services.provider('pdf', name='pdf_pages')
+def create_pdf_reader():
+    # Pay the import when the subsystem is loaded rather than on the first page.
+    importlib.import_module("pypdf")
+    return iter_pdf_pages
+
+class RateLimitedGeminiAPI:
+    def __init__(self, api_key, model="gemini-1.5-pro-latest"):
+        self.api_key = api_key
+        self.last_request_time = None
+        self.min_interval = 1
+        self.retry_attempts = 2
+        self.base_delay = 0.5
+        self.model = model
+        self._lock = threading.Lock()
+
+    def _wait_for_slot(self):
+        with self._lock:
+            if self.last_request_time:
+                time_since_last = time.time() - self.last_request_time
+                if time_since_last < self.min_interval:
+                    sleep_time = self.min_interval - time_since_last
+                    time.sleep(sleep_time)
+            self.last_request_time = time.time()
+
+    def call_gemini_api(self, prompt, model_override=None, agent="app"):
+        if not self.api_key:
+            return None
+        if not self.api_key.startswith('AIzaSy'):
+            return None
+        model = model_override or self.model
+        url = (
+            f"https://generativelanguage.googleapis.com/v1beta/models/"
+            f"{model}:generateContent?key={self.api_key}"
+        )
+        started = time.perf_counter()
+        headers = {"Content-Type": "application/json"}
+        data = {
+            "contents": [
+                {
+                    "parts": [
+                        {"text": prompt}
+                    ]
+                }
+            ]
+        }
+        for attempt in range(self.retry_attempts):
+            try:
+                self._wait_for_slot()
+                response = requests.post(url, headers=headers, json=data, timeout=15)
+                if response.status_code == 200:
+                    text = response.json()["candidates"][0]["content"]["parts"][0]["text"]
+                    record_llm_call("gemini", model, agent, "ok", started)
+                    return text
+                elif response.status_code == 429:
+                    LLM_RATE_LIMITED.inc(provider="gemini", model=model)
+                    if attempt < self.retry_attempts - 1:
+                        LLM_RETRIES.inc(provider="gemini", model=model, reason="rate_limited")
+                        time.sleep(self.base_delay * (2 ** attempt))
+                        continue
+                    else:
+                        record_llm_call("gemini", model, agent, "rate_limited", started)
+                        return None
+                else:
+                    response.raise_for_status()
+            except Exception:
+                if attempt < self.retry_attempts - 1:
+                    LLM_RETRIES.inc(provider="gemini", model=model, reason="error")
+                    time.sleep(self.base_delay * (2 ** attempt))
+                    continue
+                record_llm_call("gemini", model, agent, "error", started)
+                return None
+        return None
+
+gemini_api = RateLimitedGeminiAPI(GEMINI_API_KEY, model="gemini-1.5-pro-latest")
+gemini_flash_api = RateLimitedGeminiAPI(GEMINI_API_KEY, model="gemini-1.5-flash")
+
+def call_gemini_api(prompt, use_github_api=True, model_override=None, agent="app"):
+    client = services.openai_client
+    if use_github_api and client and github_token:
+        started = time.perf_counter()
+        try:
+            response = client.chat.completions.create(
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You are a helpful AI assistant that creates educational content and answers questions. Always include at least one diagram or visual explanation in the output.",
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt,
+                    }
+                ],
+                model="openai/gpt-4o",
+                temperature=0.8,
+                max_tokens=1800,
+                top_p=1
+            )
+            record_llm_call("github", "openai/gpt-4o", agent, "ok", started)
+            return response.choices[0].message.content
+        except Exception as e:
+            if getattr(e, "status_code", None) == 429:
+                LLM_RATE_LIMITED.inc(provider="github", model="openai/gpt-4o")
+            record_llm_call("github", "openai/gpt-4o", agent, "error", started)
+    api = gemini_flash_api if model_override == "flash" else gemini_api
+    return api.call_gemini_api(prompt, model_override="gemini-1.5-flash" if model_override == "flash" else None, agent=agent)
+
+def build_prompt_with_heading_and_diagram(title, content, icon="📘"):
+    return (
+        f"## {icon} {title}\n"
+        "Please answer in the following format:\n"
+        "- Start with a large, bold markdown heading (##) and a relevant icon for the topic.\n"
+        "- Add a diagram (as a Markdown image, ASCII, or a creative visual analogy) and provide a caption. If you can't generate an image, use ASCII or a creative analogy in markdown.\n"
+        "- Structure your explanation as concise bullet points (not paragraphs).\n"
+        "- Always include the diagram and the points, even if you must invent a visual analogy.\n\n"
+        f"Content to answer: {content}\n"
+    )
+
+def process_with_gemini(text, use_github_api=True):
+    summary_title = "AI Answer"
+    prompt = build_prompt_with_heading_and_diagram(summary_title, text, "📘")
+    result = call_gemini_api(prompt, use_github_api=use_github_api, model_override="flash", agent="answer")
+    if result is None:
+        return gemini_flash_api.call_gemini_api(prompt, model_override="gemini-1.5-flash", agent="answer")
+    return result
+
+def summarize_chunk(text, use_github_api=True):
+    prompt = (
+        "Summarize the following section of a longer study document as concise bullet points.\n"
+        "Keep every definition, formula, name, date and worked example that appears in it.\n"
+        "Do not add an introduction or conclusion.\n\n"
+        f"Section: {text}\n"
+    )
+    return call_gemini_api(prompt, use_github_api=use_github_api, model_override="flash", agent="summarize")
+
+PIPELINE_CHUNK_SIZE = int(os.getenv("PIPELINE_CHUNK_SIZE", "12000"))
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "3"))
+
+content_summarizer = StreamingSummarizer(
+    summarize_chunk,
+    process_with_gemini,
+    max_workers=PIPELINE_WORKERS,
+    max_in_flight=PIPELINE_WORKERS + 1
+)
+
+document_fetcher = RemoteDocumentFetcher(
+    UrlMetadataCache(os.path.join(CACHE_DIR, "url_metadata.sqlite3")),
+    TextCache(os.path.join(CACHE_DIR, "text")),
+    timeout=30
+)
+
+def iter_content_pages(notes, files, cleaning_stats=None):
+    if any(file_url and file_url.strip() for file_url in files):
+        services.require('pdf')
+    if notes and notes.strip():
+        yield notes.strip()
+    for i, file_url in enumerate(files):
+        if not file_url or not file_url.strip():
+            continue
+        file_url = file_url.strip()
+        try:
+            yield from document_fetcher.iter_pages(file_url, cleaning_stats)
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            error = DownloadError if status is None or status >= 500 or status == 429 else IngestionError
+            raise error(f'Could not download file {i+1}. Please check the URL: {file_url}')
+        except requests.exceptions.RequestException:
+            raise DownloadError(f'Could not download file {i+1}. Please check the URL: {file_url}')
+        except Exception as e:
+            raise IngestionError(f'Could not extract text from PDF {i+1}: {str(e)}')
+
+def iter_audio_segments(text, voice='af_heart', speed=1):
+    for gs, ps, audio in services.pipeline(text, voice=voice, speed=speed):
+        yield audio
+
+def report_chunk_progress(chunks, stats, on_progress):
+    for chunk in chunks:
+        on_progress(pages=stats.pages, chunks=stats.chunks, characters=stats.characters)
+        yield chunk
+
+def run_content_pipeline(notes, files, on_progress=None):
+    stats = PipelineStats()
+    cleaning_stats = CleaningStats()
+    pages = drop_near_duplicates(iter_content_pages(notes, files, cleaning_stats), cleaning_stats)
+    chunks = iter_chunks(pages, chunk_size=PIPELINE_CHUNK_SIZE, stats=stats)
+    if on_progress is not None:
+        chunks = report_chunk_progress(chunks, stats, on_progress)
+    try:
+        processed_content = content_summarizer.run(chunks, stats)
+    except DownloadError as e:
+        return {'error': str(e)}, 502
+    except IngestionError as e:
+        return {'error': str(e)}, 400
+    if not stats.pages:
+        return {
+            'error': 'No content to process. Please provide PDF files with readable text or add notes.',
+            'debug_info': {
+                'files_received': len(files),
+                'notes_length': len(notes) if notes else 0,
+                'text_extracted': 0
+            }
+        }, 400
+    if not processed_content:
+        return {
+            'error': 'AI processing failed. Please try again.'
+        }, 503
+    return {
+        'response': processed_content,
+        'status': 'success',
+        'debug_info': {
+            'content_length': stats.characters,
+            'chunks_processed': stats.chunks,
+            'chunks_failed': stats.failed_chunks,
+            'cleaning': cleaning_stats.to_dict(),
+            'files_processed': len(files),
+            'had_notes': bool(notes and notes.strip())
+        }
+    }, 200
+
+def run_content_job(payload, context):
+    body, status = run_content_pipeline(payload.get('notes', ''), payload.get('files', []), on_progress=context.report)
+    if status == 200:
+        return body
+    if status in (502, 503):
+        raise RuntimeError(body['error'])
+    raise PermanentJobError(body['error'])
+
+job_store = JobStore(
+    os.path.join(CACHE_DIR, "jobs.sqlite3"),
+    result_ttl=float(os.getenv("JOB_RESULT_TTL", "3600"))
+)
+audiobook_store = AudiobookStore(
+    os.path.join(CACHE_DIR, "audiobooks"),
+    ttl=float(os.getenv("AUDIOBOOK_TTL", str(7 * 24 * 3600)))
+)
+
+def run_audiobook_job(payload, context):
+    """Synthesize every section of a book that isn't on disk yet.
+
+    Finished sections survive failures and retries, so a rerun only
+    generates what is missing.
+    """
+    book_id = payload['book_id']
+    try:
+        book = audiobook_store.load(book_id)
+        texts = audiobook_store.section_texts(book_id)
+    except AudiobookError as e:
+        raise PermanentJobError(str(e))
+    total = len(texts)
+    done = sum(audiobook_store.has_section(book_id, index) for index in range(total))
+    for index, text in enumerate(texts):
+        if audiobook_store.has_section(book_id, index):
+            continue
+        context.report(force=True, sections_done=done, sections_total=total, section=index)
+        samples = [0]
+
+        def segments():
+            for audio in iter_audio_segments(text, voice=book['voice'], speed=book['speed']):
+                samples[0] += len(audio)
+                context.report(sections_done=done, sections_total=total, section=index)
+                yield audio
+
+        audiobook_store.write_section(
+            book_id, index,
+            iter_encoded_stream(segments(), services.pipeline.sample_rate, book['format']),
+            info=lambda: {'duration': samples[0] / services.pipeline.sample_rate}
+        )
+        done += 1
+    context.report(force=True, sections_done=done, sections_total=total)
+    return {'book_id': book_id, 'sections': total}
+
+job_handlers = {
+    'process-content': run_content_job,
+    'audiobook': run_audiobook_job
+}
+
+def build_stt_model():
+    whisper_settings = {
+        'model_name': os.getenv("WHISPER_MODEL", "base"),
+        'download_root': os.getenv("WHISPER_DOWNLOAD_ROOT") or None
+    }
+    if os.getenv("WHISPER_THREADS"):
+        whisper_settings['threads'] = int(os.getenv("WHISPER_THREADS"))
+    if os.getenv("WHISPER_INTEROP_THREADS"):
+        whisper_settings['interop_threads'] = int(os.getenv("WHISPER_INTEROP_THREADS"))
+    # WHISPER_CPU_PROFILE=1 opts in to int8 dynamic quantization with threads
+    # split across gunicorn workers; see bench_whisper_cpu.py for the trade-off.
+    if os.getenv("WHISPER_CPU_PROFILE", "").lower() in ("1", "true", "yes"):
+        return WhisperModelLoader.cpu_profile(**whisper_settings)
+    return WhisperModelLoader(device=os.getenv("WHISPER_DEVICE") or None, **whisper_settings)
+
+def build_transcription_service(loader):
+    return TranscriptionService(
+        loader,
+        max_queue=int(os.getenv("STT_MAX_QUEUE", "16")),
+        max_batch=int(os.getenv("STT_MAX_BATCH", "8")),
+        batch_window=float(os.getenv("STT_BATCH_WINDOW", "0.025")),
+        default_timeout=float(os.getenv("STT_TIMEOUT", "60")),
+        cache=TranscriptCache(
+            os.path.join(CACHE_DIR, "transcripts.sqlite3"),
+            max_entries=int(os.getenv("STT_CACHE_MAX_ENTRIES", "10000"))
+        )
+    )
+
+@services.provider('stt', name='stt_model')
+def create_stt_model():
+    return RemoteWhisperModel(model_server) if model_server else build_stt_model()
+
+@services.provider('stt', name='transcription_service')
+def create_transcription_service():
+    if model_server:
+        return RemoteTranscriptionService(model_server, default_timeout=float(os.getenv("STT_TIMEOUT", "60")))
+    return build_transcription_service(services.stt_model)
+
+@services.provider('stt', name='live_transcriptions')
+def create_live_transcriptions():
+    return LiveTranscriptionRegistry(
+        services.transcription_service,
+        idle_timeout=float(os.getenv("STT_STREAM_IDLE_TIMEOUT", "300")),
+        max_streams=int(os.getenv("STT_MAX_STREAMS", "32")),
+        finished_ttl=float(os.getenv("STT_STREAM_FINISHED_TTL", "60"))
+    )
@@ -0,0 +1,55 @@
+"""
+MindFlow Speech Module
+This module contains the text-to-speech and speech-to-text helpers.
+"""
+
+from .audiobook import AudiobookError, AudiobookStore, paginate_text, split_sections
+from .decode import AudioDecodeError, decode_audio, decode_mono, resample
+from .encode import AUDIO_FORMATS, FORMAT_ALIASES, AudioFormat, available_audio_formats, iter_encoded_stream
+from .live import LiveTranscription, LiveTranscriptionRegistry
+from .segment import split_segments
+from .sidecar import (ModelServer, ModelServerClient, ModelServerError, RemoteSpeechPipeline,
+                      RemoteTranscriptionService, RemoteWhisperModel)
+from .streaming import iter_wav_stream, to_pcm16, wav_header
+from .transcription import TranscriptionRejected, TranscriptionService
+from .transcript_cache import TranscriptCache, transcript_key
+from .tts_cache import SegmentAudioCache, segment_key
+from .vad import EnergyVAD
+from .whisper_loader import WHISPER_SAMPLE_RATE, WhisperModelLoader
+
+__all__ = [
+    'AUDIO_FORMATS',
+    'FORMAT_ALIASES',
+    'AudioDecodeError',
+    'AudioFormat',
+    'AudiobookError',
+    'AudiobookStore',
+    'EnergyVAD',
+    'LiveTranscription',
+    'LiveTranscriptionRegistry',
+    'ModelServer',
+    'ModelServerClient',
+    'ModelServerError',
+    'RemoteSpeechPipeline',
+    'RemoteTranscriptionService',
+    'RemoteWhisperModel',
+    'SegmentAudioCache',
+    'TranscriptCache',
+    'TranscriptionRejected',
+    'TranscriptionService',
+    'WHISPER_SAMPLE_RATE',
+    'WhisperModelLoader',
+    'available_audio_formats',
+    'decode_audio',
+    'decode_mono',
+    'iter_encoded_stream',
+    'iter_wav_stream',
+    'paginate_text',
+    'resample',
+    'segment_key',
+    'split_sections',
+    'split_segments',
+    'to_pcm16',
+    'transcript_key',
+    'wav_header'
+]
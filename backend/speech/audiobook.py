@@ -0,0 +1,242 @@
+"""Audiobooks: long documents synthesized section by section in the background.
+
+Each book is a directory holding ``book.json`` (settings and section list),
+``text.json`` (the text of every section) and one encoded audio file per
+finished section. A section counts as ready once its audio file exists; it
+is written under a temporary name and renamed into place, so a crashed or
+retried job simply resumes with the first missing section.
+"""
+
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .streaming import patch_wav_sizes
+
+_BOOK_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+_CHAPTER_RE = re.compile(
+    r"^(?:chapter|part|unit|lesson|module)\s+(?:\d+|[ivxlc]+|[a-z]+)\b[^\n]{0,80}$",
+    re.IGNORECASE
+)
+_HEADING_LINES = 3
+
+
+class AudiobookError(Exception):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def _chapter_title(page: str) -> Optional[str]:
+    for line in page.strip().splitlines()[:_HEADING_LINES]:
+        line = line.strip()
+        if _CHAPTER_RE.match(line):
+            return line
+    return None
+
+
+def paginate_text(text: str, page_chars: int = 3000) -> List[str]:
+    """Break plain text into page-sized runs of paragraphs for :func:`split_sections`.
+
+    Form feeds are honoured as page breaks, and a paragraph that looks like a
+    chapter heading always starts a new page.
+    """
+    pages = []
+    for block in text.split("\f"):
+        current = []
+        size = 0
+        for paragraph in re.split(r"\n\s*\n", block):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            if current and (size + len(paragraph) > page_chars or _chapter_title(paragraph)):
+                pages.append("\n\n".join(current))
+                current = []
+                size = 0
+            current.append(paragraph)
+            size += len(paragraph)
+        if current:
+            pages.append("\n\n".join(current))
+    return pages
+
+
+def split_sections(pages: Iterable[str], max_chars: int = 30000) -> List[Dict[str, Any]]:
+    """Group page texts into chapters, or into single pages if none are found.
+
+    A page whose first lines look like "Chapter 3 ..." starts a new chapter.
+    Chapters longer than ``max_chars`` are continued in a new section at the
+    next page break so no single file takes too long to generate.
+    """
+    pages = [page for page in pages if page.strip()]
+    titles = [_chapter_title(page) for page in pages]
+    if sum(title is not None for title in titles) < 2:
+        return [
+            {"title": f"Page {number}", "first_page": number, "last_page": number, "text": page}
+            for number, page in enumerate(pages, 1)
+        ]
+
+    sections = []
+    current = None
+    for number, (page, title) in enumerate(zip(pages, titles), 1):
+        if current is not None and (title is not None or len(current["text"]) + len(page) > max_chars):
+            sections.append(current)
+            if title is None:
+                title = f"{current['title']} (continued)"
+            current = None
+        if current is None:
+            current = {"title": title or "Front matter", "first_page": number, "last_page": number, "text": page}
+        else:
+            current["text"] = f"{current['text']}\n\n{page}"
+            current["last_page"] = number
+    if current is not None:
+        sections.append(current)
+    return sections
+
+
+class AudiobookStore:
+    def __init__(self, directory: str, ttl: float = 7 * 24 * 3600):
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _book_dir(self, book_id: str) -> str:
+        if not _BOOK_ID_RE.match(book_id or ""):
+            raise AudiobookError("Unknown audiobook", 404)
+        return os.path.join(self.directory, book_id)
+
+    def _write_json(self, path: str, data: Any) -> None:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def _read_json(self, path: str) -> Any:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            raise AudiobookError("Unknown audiobook", 404)
+
+    def create(self, sections: List[Dict[str, Any]], audio_format: str,
+               voice: Optional[str] = None, speed: float = 1, title: Optional[str] = None) -> str:
+        if not sections:
+            raise AudiobookError("No text to synthesize")
+        self.purge_expired()
+        book_id = uuid.uuid4().hex
+        book_dir = self._book_dir(book_id)
+        os.makedirs(book_dir)
+        self._write_json(os.path.join(book_dir, "text.json"), [section["text"] for section in sections])
+        self._write_json(os.path.join(book_dir, "book.json"), {
+            "book_id": book_id,
+            "title": title,
+            "format": audio_format,
+            "voice": voice,
+            "speed": speed,
+            "created_at": time.time(),
+            "sections": [
+                {
+                    "index": index,
+                    "title": section["title"],
+                    "first_page": section["first_page"],
+                    "last_page": section["last_page"],
+                    "characters": len(section["text"])
+                }
+                for index, section in enumerate(sections)
+            ]
+        })
+        return book_id
+
+    def attach_job(self, book_id: str, job_id: str) -> None:
+        book = self.load(book_id)
+        book["job_id"] = job_id
+        self._write_json(os.path.join(self._book_dir(book_id), "book.json"), book)
+
+    def load(self, book_id: str) -> Dict[str, Any]:
+        return self._read_json(os.path.join(self._book_dir(book_id), "book.json"))
+
+    def section_texts(self, book_id: str) -> List[str]:
+        return self._read_json(os.path.join(self._book_dir(book_id), "text.json"))
+
+    def section_path(self, book_id: str, index: int) -> str:
+        book = self.load(book_id)
+        if not 0 <= index < len(book["sections"]):
+            raise AudiobookError("Unknown section", 404)
+        return os.path.join(self._book_dir(book_id), f"{index:04d}.{book['format']}")
+
+    def has_section(self, book_id: str, index: int) -> bool:
+        return os.path.exists(self.section_path(book_id, index))
+
+    def write_section(self, book_id: str, index: int, chunks: Iterable[bytes],
+                      info: Optional[Callable[[], Dict[str, Any]]] = None) -> None:
+        """Store a section's encoded audio, then make it visible atomically.
+
+        ``info`` is called once ``chunks`` is exhausted and its result (such as
+        the duration) is saved alongside the audio.
+        """
+        path = self.section_path(book_id, index)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for data in chunks:
+                    f.write(data)
+                if path.endswith(".wav"):
+                    # The streaming encoder can't know the sizes up front.
+                    patch_wav_sizes(f)
+            details = dict(info() if info else {})
+            details["bytes"] = os.path.getsize(tmp_path)
+            self._write_json(f"{path}.json", details)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def manifest(self, book_id: str) -> Dict[str, Any]:
+        """The book settings plus per-section readiness, duration and start time.
+
+        ``start`` is the offset of each section within the whole book, known
+        for every section whose predecessors are all ready.
+        """
+        book = self.load(book_id)
+        book_dir = self._book_dir(book_id)
+        start = 0.0
+        ready = 0
+        for section in book["sections"]:
+            path = os.path.join(book_dir, f"{section['index']:04d}.{book['format']}")
+            section["ready"] = os.path.exists(path)
+            section["start"] = start
+            if section["ready"]:
+                ready += 1
+                try:
+                    with open(f"{path}.json", "r", encoding="utf-8") as f:
+                        section.update(json.load(f))
+                except (OSError, ValueError):
+                    pass
+            if start is not None and section.get("duration") is not None:
+                start += section["duration"]
+            else:
+                start = None
+        book["sections_ready"] = ready
+        book["sections_total"] = len(book["sections"])
+        book["complete"] = ready == len(book["sections"])
+        return book
+
+    def delete(self, book_id: str) -> None:
+        shutil.rmtree(self._book_dir(book_id), ignore_errors=True)
+
+    def purge_expired(self) -> None:
+        cutoff = time.time() - self.ttl
+        for entry in os.scandir(self.directory):
+            if entry.is_dir() and _BOOK_ID_RE.match(entry.name):
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                except OSError:
+                    continue
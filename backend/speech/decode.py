@@ -0,0 +1,77 @@
+"""In-memory audio decoding and resampling."""
+
+import io
+import subprocess
+from math import gcd
+from typing import Tuple
+
+import numpy as np
+import soundfile as sf
+
+
+# Containers libsndfile never reads (WebM/Matroska from MediaRecorder, MP4/M4A
+# via "ftyp" at offset 4) go straight to ffmpeg instead of failing a probe first.
+_MATROSKA_MAGIC = b"\x1a\x45\xdf\xa3"
+
+
+class AudioDecodeError(Exception):
+    pass
+
+
+def resample(audio: np.ndarray, orig_rate: int, target_rate: int) -> np.ndarray:
+    """Resample mono or multi-channel float audio along the first axis."""
+    audio = np.asarray(audio, dtype=np.float32)
+    if orig_rate == target_rate or not len(audio):
+        return audio
+    try:
+        # Imported here: scipy.signal costs a few hundred ms at startup.
+        from scipy.signal import resample_poly
+    except ImportError:
+        resample_poly = None
+    if resample_poly is not None:
+        divisor = gcd(orig_rate, target_rate)
+        return resample_poly(audio, target_rate // divisor, orig_rate // divisor, axis=0).astype(np.float32)
+    # Linear interpolation is good enough for speech when scipy is missing.
+    length = int(round(len(audio) * target_rate / orig_rate))
+    positions = np.linspace(0, len(audio) - 1, length)
+    if audio.ndim == 1:
+        return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+    return np.stack(
+        [np.interp(positions, np.arange(len(audio)), audio[:, channel]) for channel in range(audio.shape[1])],
+        axis=1
+    ).astype(np.float32)
+
+
+def _decode_with_ffmpeg(data: bytes, sample_rate: int) -> Tuple[np.ndarray, int]:
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", "pipe:0",
+             "-f", "f32le", "-ac", "1", "-ar", str(sample_rate), "pipe:1"],
+            input=data, capture_output=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise AudioDecodeError(f"Could not decode audio: {e}") from e
+    return np.frombuffer(result.stdout, dtype=np.float32), sample_rate
+
+
+def decode_audio(data: bytes, fallback_rate: int = 24000) -> Tuple[np.ndarray, int]:
+    """Decode encoded audio bytes to float32 samples and their sample rate.
+
+    libsndfile handles WAV, FLAC, OGG/Opus and (from 1.1) MP3 in process and
+    without touching the filesystem. Anything else (WebM, M4A, ...) is piped
+    through ffmpeg, which resamples to ``fallback_rate``.
+    """
+    if not data.startswith(_MATROSKA_MAGIC) and data[4:8] != b"ftyp":
+        try:
+            return sf.read(io.BytesIO(data), dtype="float32")
+        except (RuntimeError, TypeError):
+            pass
+    return _decode_with_ffmpeg(data, fallback_rate)
+
+
+def decode_mono(data: bytes, sample_rate: int) -> np.ndarray:
+    """Decode audio bytes to mono float32 at ``sample_rate``."""
+    audio, source_rate = decode_audio(data, fallback_rate=sample_rate)
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    return resample(audio, source_rate, sample_rate)
@@ -0,0 +1,92 @@
+"""Incremental compressed encoding (Opus/OGG, MP3) for streamed speech."""
+
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional
+
+import numpy as np
+import soundfile as sf
+
+from .streaming import iter_wav_stream
+
+
+class AudioFormat(NamedTuple):
+    mimetype: str
+    container: Optional[str]
+    subtype: Optional[str]
+    options: Dict
+
+
+# MP3 is encoded at a constant bitrate: a VBR stream needs a Xing header that
+# libsndfile only fills in by seeking back on close, which a response can't do.
+AUDIO_FORMATS = {
+    "wav": AudioFormat("audio/wav", None, None, {}),
+    "ogg": AudioFormat("audio/ogg", "OGG", "OPUS", {}),
+    "mp3": AudioFormat("audio/mpeg", "MP3", "MPEG_LAYER_III", {"bitrate_mode": "CONSTANT", "compression_level": 0.8}),
+}
+FORMAT_ALIASES = {"opus": "ogg", "wave": "wav", "mpeg": "mp3"}
+
+
+def available_audio_formats() -> Dict[str, AudioFormat]:
+    """The output formats the installed libsndfile can encode."""
+    formats = {}
+    for name, audio_format in AUDIO_FORMATS.items():
+        if audio_format.container is None:
+            formats[name] = audio_format
+        elif (audio_format.container in sf.available_formats()
+              and audio_format.subtype in sf.available_subtypes(audio_format.container)):
+            formats[name] = audio_format
+    return formats
+
+
+class _DrainBuffer:
+    """Write-only file object whose contents are handed out as they arrive.
+
+    libsndfile probes the sink with seek/tell before writing; both just report
+    the current position so the encoder behaves as if writing to a pipe.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def read(self, size: int = -1) -> bytes:
+        return b""
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_encoded_stream(segments: Iterable[np.ndarray], sample_rate: int, fmt: str = "wav") -> Iterator[bytes]:
+    """Yield encoded audio for each segment as soon as the encoder emits it."""
+    audio_format = AUDIO_FORMATS[fmt]
+    if audio_format.container is None:
+        yield from iter_wav_stream(segments, sample_rate)
+        return
+    sink = _DrainBuffer()
+    with sf.SoundFile(sink, "w", sample_rate, 1, format=audio_format.container,
+                      subtype=audio_format.subtype, **audio_format.options) as encoder:
+        for audio in segments:
+            audio = np.asarray(audio, dtype=np.float32)
+            if audio.ndim > 1:
+                audio = audio.mean(axis=1)
+            if len(audio):
+                encoder.write(np.clip(audio, -1.0, 1.0))
+            data = sink.drain()
+            if data:
+                yield data
+    data = sink.drain()
+    if data:
+        yield data
@@ -0,0 +1,170 @@
+"""Live transcription sessions: chunked audio in, partial and final text out.
+
+Clients push raw 16-bit PCM as it is recorded. An :class:`EnergyVAD` cuts it
+into utterance segments, and each finished segment is queued on the shared
+:class:`TranscriptionService` as soon as it closes, so the final text lags
+speech by about one segment. While someone is still talking, the segment in
+progress is transcribed every ``partial_interval`` seconds for a partial
+result, but only while the service queue is idle so partials never delay
+finals.
+
+Sessions live in the memory of the process that created them, so every
+request for one stream must reach the same worker. Once its last final
+result is out, a session stops counting toward the stream limit but stays
+readable for ``finished_ttl`` seconds, so a client can still open the
+events stream after ending the recording.
+"""
+
+import queue
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+
+from .decode import resample
+from .transcription import TranscriptionRejected, TranscriptionService
+from .vad import EnergyVAD
+from .whisper_loader import WHISPER_SAMPLE_RATE
+
+_FINAL = "final"
+_PARTIAL = "partial"
+_END = "end"
+
+
+class LiveTranscription:
+    def __init__(self, service: TranscriptionService, partial_interval: float = 1.5, **options: Any):
+        self.stream_id = uuid.uuid4().hex
+        self.service = service
+        self.partial_interval = partial_interval
+        self.options = options
+        self.vad = EnergyVAD(sample_rate=WHISPER_SAMPLE_RATE)
+        self.events: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self.received_seconds = 0.0
+        self.segments = 0
+        self.ended = False
+        self.finished_at: Optional[float] = None
+        self.touched_at = time.monotonic()
+        self._work: "queue.Queue[tuple]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._last_partial = 0.0
+        self._worker = threading.Thread(target=self._run, name=f"live-stt-{self.stream_id[:8]}", daemon=True)
+        self._worker.start()
+
+    def feed_pcm16(self, data: bytes, sample_rate: int = WHISPER_SAMPLE_RATE) -> Dict[str, Any]:
+        """Add little-endian 16-bit mono PCM; returns the stream's status."""
+        audio = np.frombuffer(data[:len(data) - len(data) % 2], dtype="<i2").astype(np.float32) / 32768.0
+        return self.feed(resample(audio, sample_rate, WHISPER_SAMPLE_RATE))
+
+    def feed(self, audio: np.ndarray) -> Dict[str, Any]:
+        with self._lock:
+            if self.ended:
+                raise TranscriptionRejected("Stream already ended", 409)
+            self.touched_at = time.monotonic()
+            self.received_seconds += len(audio) / WHISPER_SAMPLE_RATE
+            for segment in self.vad.feed(audio):
+                self._work.put((_FINAL, self.segments, segment))
+                self.segments += 1
+            now = time.monotonic()
+            if (self.vad.in_speech and now - self._last_partial >= self.partial_interval
+                    and self._work.empty() and self.service.queue_depth == 0):
+                current = self.vad.current()
+                if current is not None:
+                    self._last_partial = now
+                    self._work.put((_PARTIAL, self.segments, current))
+            return self.status()
+
+    def end(self) -> Dict[str, Any]:
+        with self._lock:
+            if not self.ended:
+                self.ended = True
+                segment = self.vad.flush()
+                if segment is not None:
+                    self._work.put((_FINAL, self.segments, segment))
+                    self.segments += 1
+                self._work.put((_END, self.segments, None))
+            return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "stream_id": self.stream_id,
+            "received_seconds": round(self.received_seconds, 3),
+            "segments": self.segments,
+            "in_speech": self.vad.in_speech,
+            "ended": self.ended
+        }
+
+    def _run(self) -> None:
+        while True:
+            kind, index, audio = self._work.get()
+            if kind == _END:
+                self.events.put({"type": _END, "segments": index})
+                self.finished_at = time.monotonic()
+                return
+            if kind == _PARTIAL and not self._work.empty():
+                # A newer partial or the final for this segment is already waiting.
+                continue
+            try:
+                result = self.service.transcribe(audio, use_cache=kind == _FINAL, **self.options)
+            except Exception as e:
+                if kind == _FINAL:
+                    self.events.put({"type": "error", "segment": index, "error": str(e)})
+                continue
+            self.events.put({"type": kind, "segment": index, "text": result["text"].strip()})
+
+    def iter_events(self, timeout: float = 600.0, keep_alive: float = 15.0) -> Iterator[Optional[Dict[str, Any]]]:
+        """Yield events until the stream ends; ``None`` means nothing happened for ``keep_alive`` seconds."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                event = self.events.get(timeout=keep_alive)
+            except queue.Empty:
+                yield None
+                continue
+            yield event
+            if event["type"] == _END:
+                return
+
+
+class LiveTranscriptionRegistry:
+    def __init__(self, service: TranscriptionService, idle_timeout: float = 300.0, max_streams: int = 32,
+                 finished_ttl: float = 60.0):
+        self.service = service
+        self.idle_timeout = idle_timeout
+        self.max_streams = max_streams
+        self.finished_ttl = finished_ttl
+        self._streams: Dict[str, LiveTranscription] = {}
+        self._lock = threading.Lock()
+
+    def create(self, **options: Any) -> LiveTranscription:
+        self.purge_idle()
+        with self._lock:
+            if self._active() >= self.max_streams:
+                raise TranscriptionRejected("Too many live transcription streams", 503, retry_after=self.idle_timeout)
+            stream = LiveTranscription(self.service, **options)
+            self._streams[stream.stream_id] = stream
+            return stream
+
+    def _active(self) -> int:
+        return sum(1 for stream in list(self._streams.values()) if stream.finished_at is None)
+
+    def __len__(self) -> int:
+        """Streams still producing results; finished ones kept for late readers don't count."""
+        return self._active()
+
+    def get(self, stream_id: str) -> Optional[LiveTranscription]:
+        with self._lock:
+            return self._streams.get(stream_id)
+
+    def purge_idle(self) -> None:
+        now = time.monotonic()
+        cutoff = now - self.idle_timeout
+        with self._lock:
+            for stream_id, stream in list(self._streams.items()):
+                finished_at = stream.finished_at
+                if finished_at is not None and finished_at < now - self.finished_ttl:
+                    del self._streams[stream_id]
+                elif stream.touched_at < cutoff:
+                    stream.end()
+                    del self._streams[stream_id]
@@ -0,0 +1,79 @@
+"""Sentence and paragraph segmentation for speech synthesis."""
+
+import re
+import zlib
+from typing import Iterator, Tuple
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+# Sentences end at terminal punctuation (plus closing quotes or brackets)
+# followed by whitespace, so "3.14", "10:30" and "example.com" stay whole.
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])[\"')\]]*\s+")
+
+
+def _sentence_spans(paragraph: str) -> Iterator[Tuple[int, int]]:
+    start = 0
+    for match in _SENTENCE_END_RE.finditer(paragraph):
+        end = match.start() + len(match.group().rstrip())
+        yield start, end
+        start = match.end()
+    if start < len(paragraph):
+        yield start, len(paragraph)
+
+
+def _wrap(paragraph: str, start: int, end: int, max_chars: int) -> Iterator[Tuple[int, int]]:
+    """Break an overlong sentence span at word boundaries."""
+    while end - start > max_chars:
+        cut = paragraph.rfind(" ", start, start + max_chars)
+        if cut <= start:
+            cut = start + max_chars
+        yield start, cut
+        start = cut + 1 if paragraph[cut] == " " else cut
+    if start < end:
+        yield start, end
+
+
+def split_segments(
+    text: str,
+    max_chars: int = 500,
+    first_max_chars: int = 160,
+    min_chars: int = 120,
+    boundary_every: int = 3
+) -> Iterator[str]:
+    """Yield speakable segments of whole sentences, never crossing paragraphs.
+
+    Consecutive sentences are merged up to ``max_chars``. The first segment
+    is capped at ``first_max_chars`` so playback can start quickly.
+
+    Once a segment holds ``min_chars``, it also ends after any sentence whose
+    hash is divisible by ``boundary_every``. Those boundaries depend on the
+    sentences rather than on their position, so after an edit the
+    segmentation usually realigns at the next such boundary and the cached
+    audio for later segments is reused. It is not guaranteed: the edit can
+    move a segment past ``min_chars`` or ``max_chars``, and a change in the
+    first segment is subject to ``first_max_chars``, which can shift the
+    boundaries that follow.
+    """
+    limit = first_max_chars
+    for paragraph in _PARAGRAPH_RE.split(text):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        current = None
+        previous_end = 0
+        for sentence_start, sentence_end in _sentence_spans(paragraph):
+            for start, end in _wrap(paragraph, sentence_start, sentence_end, limit):
+                if current is not None and end - current > limit:
+                    yield paragraph[current:previous_end]
+                    current = None
+                    limit = max_chars
+                if current is None:
+                    current = start
+                previous_end = end
+                piece = paragraph[start:end]
+                if end - current >= min_chars and zlib.crc32(piece.encode("utf-8")) % boundary_every == 0:
+                    yield paragraph[current:end]
+                    current = None
+                    limit = max_chars
+        if current is not None:
+            yield paragraph[current:previous_end]
+            limit = max_chars
@@ -0,0 +1,396 @@
+"""Model-serving sidecar: one process owns Whisper and the TTS pipeline for every web worker.
+
+Without it, each gunicorn worker loads its own copy of the Whisper model and
+the torch runtime. With ``MODEL_SERVER_SOCKET`` set, the web workers use the
+``Remote*`` adapters below, which have the same interface as the local
+objects, and send requests to ``python model_server.py`` over a Unix socket.
+Inside the sidecar, transcriptions from all workers go through one
+:class:`TranscriptionService` queue, so they are batched together and share
+its cache. Synthesis jobs run at most ``max_synthesis`` at a time, and
+further jobs wait up to ``synthesis_wait`` seconds for a slot.
+
+Each message is a frame: 4 byte header length, 4 byte payload length, a JSON
+header, then the raw payload (float32 samples when it carries audio). A
+connection carries one request at a time; clients keep a small pool of
+connections.
+"""
+
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from metrics import MODEL_SERVER_FAMILIES, STT_QUEUE_DEPTH, TTS_ACTIVE_JOBS, render as render_metrics
+
+from .decode import resample
+from .transcription import TranscriptionRejected, TranscriptionService
+
+_FRAME = struct.Struct("!II")
+MAX_FRAME_BYTES = 512 * 1024 * 1024
+
+
+class ModelServerError(TranscriptionRejected):
+    """An error reported by the sidecar, or the sidecar being unreachable."""
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> Optional[bytearray]:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            return None
+        received += count
+    # A bytearray keeps arrays made with np.frombuffer writable.
+    return buffer
+
+
+def send_frame(sock: socket.socket, header: Dict[str, Any], payload: bytes = b"") -> None:
+    encoded = json.dumps(header, default=str).encode("utf-8")
+    sock.sendall(_FRAME.pack(len(encoded), len(payload)) + encoded)
+    if payload:
+        sock.sendall(payload)
+
+
+def recv_frame(sock: socket.socket) -> Optional[Tuple[Dict[str, Any], bytes]]:
+    """Read one frame; ``None`` when the peer closed the connection between frames."""
+    prefix = _recv_exactly(sock, _FRAME.size)
+    if prefix is None:
+        return None
+    header_size, payload_size = _FRAME.unpack(prefix)
+    if header_size + payload_size > MAX_FRAME_BYTES:
+        raise ValueError("Frame too large")
+    header = _recv_exactly(sock, header_size)
+    payload = _recv_exactly(sock, payload_size) if payload_size else b""
+    if header is None or payload is None:
+        raise ConnectionError("Connection closed mid-frame")
+    return json.loads(header), payload
+
+
+def _error_header(e: Exception) -> Dict[str, Any]:
+    if isinstance(e, TranscriptionRejected):
+        return {"error": str(e), "status": e.status, "retry_after": e.retry_after}
+    return {"error": str(e) or type(e).__name__, "status": 500}
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self) -> None:
+        model_server = self.server.model_server
+        while True:
+            try:
+                frame = recv_frame(self.request)
+            except (ConnectionError, ValueError):
+                return
+            if frame is None:
+                return
+            header, payload = frame
+            try:
+                model_server.dispatch(self.request, header, payload)
+            except (BrokenPipeError, ConnectionResetError):
+                return
+
+
+class ModelServer:
+    def __init__(
+        self,
+        socket_path: str,
+        transcription_service: Optional[TranscriptionService] = None,
+        pipeline: Any = None,
+        max_synthesis: int = 2,
+        synthesis_wait: float = 30.0
+    ):
+        self.socket_path = socket_path
+        self.transcription_service = transcription_service
+        self.pipeline = pipeline
+        self.max_synthesis = max_synthesis
+        self.synthesis_wait = synthesis_wait
+        self.synthesis_active = 0
+        self.synthesis_rejected = 0
+        self._synthesis_slots = threading.BoundedSemaphore(max_synthesis)
+        self._lock = threading.Lock()
+        self._server = None
+        if pipeline is not None:
+            TTS_ACTIVE_JOBS.set_function(lambda: self.synthesis_active)
+        if transcription_service is not None:
+            STT_QUEUE_DEPTH.set_function(lambda: transcription_service.queue_depth)
+
+    def serve_forever(self) -> None:
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, _Handler)
+        self._server.daemon_threads = True
+        self._server.model_server = self
+        os.chmod(self.socket_path, 0o660)
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def shutdown(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+
+    def dispatch(self, sock: socket.socket, header: Dict[str, Any], payload: bytes) -> None:
+        op = header.get("op")
+        try:
+            if op == "transcribe":
+                send_frame(sock, {"result": self._transcribe(header, payload)})
+            elif op == "synthesize":
+                self._synthesize(sock, header)
+            elif op == "warmup":
+                self._require_stt().warm_up()
+                send_frame(sock, self.status())
+            elif op == "status":
+                send_frame(sock, self.status())
+            elif op == "metrics":
+                send_frame(sock, {"text": render_metrics(include=MODEL_SERVER_FAMILIES)})
+            else:
+                send_frame(sock, {"error": f"Unknown operation: {op}", "status": 400})
+        except (BrokenPipeError, ConnectionResetError):
+            raise
+        except Exception as e:
+            send_frame(sock, _error_header(e))
+
+    def _require_stt(self) -> TranscriptionService:
+        if self.transcription_service is None:
+            raise ModelServerError("Speech-to-text is not served by this model server")
+        return self.transcription_service
+
+    def _transcribe(self, header: Dict[str, Any], payload: bytes) -> Dict[str, Any]:
+        service = self._require_stt()
+        audio = np.frombuffer(payload, dtype=np.float32)
+        return service.transcribe(
+            audio,
+            timeout=header.get("timeout_seconds"),
+            use_cache=header.get("use_cache", True),
+            **header.get("options", {})
+        )
+
+    def _synthesize(self, sock: socket.socket, header: Dict[str, Any]) -> None:
+        if self.pipeline is None:
+            raise ModelServerError("Text-to-speech is not served by this model server")
+        if not self._synthesis_slots.acquire(timeout=self.synthesis_wait):
+            with self._lock:
+                self.synthesis_rejected += 1
+            raise ModelServerError("Text-to-speech is busy", retry_after=self.synthesis_wait)
+        with self._lock:
+            self.synthesis_active += 1
+        try:
+            segments = self.pipeline(header["text"], voice=header.get("voice"), speed=header.get("speed", 1))
+            try:
+                for segment, _, audio in segments:
+                    send_frame(
+                        sock,
+                        {"segment": segment, "sample_rate": self.pipeline.sample_rate},
+                        np.ascontiguousarray(audio, dtype=np.float32).tobytes()
+                    )
+            finally:
+                segments.close()
+            send_frame(sock, {"end": True})
+        finally:
+            with self._lock:
+                self.synthesis_active -= 1
+            self._synthesis_slots.release()
+
+    def status(self) -> Dict[str, Any]:
+        service = self.transcription_service
+        return {
+            "stt": service.loader.status() if service is not None else None,
+            "transcription": service.stats() if service is not None else None,
+            "tts": {
+                "sample_rate": self.pipeline.sample_rate,
+                "active": self.synthesis_active,
+                "max": self.max_synthesis,
+                "rejected": self.synthesis_rejected
+            } if self.pipeline is not None else None
+        }
+
+
+class ModelServerClient:
+    """Connection pool and request/response calls to a :class:`ModelServer`."""
+
+    def __init__(self, socket_path: str, timeout: float = 120.0, max_idle: int = 8):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle: List[socket.socket] = []
+        self._lock = threading.Lock()
+
+    def _connect(self, timeout: float) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError as e:
+            sock.close()
+            raise ModelServerError(f"Model server unavailable: {e}", retry_after=5) from e
+        return sock
+
+    def _release(self, sock: socket.socket) -> None:
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(sock)
+                return
+        sock.close()
+
+    @contextmanager
+    def _exchange(self, header: Dict[str, Any], payload: bytes, timeout: float) -> Iterator[socket.socket]:
+        """Send a request on a pooled connection and yield it for reading the response.
+
+        A pooled connection may have been closed by a restarted sidecar, so a
+        failed send is retried once on a fresh connection. The connection is
+        only returned to the pool when the caller read the whole response.
+        """
+        with self._lock:
+            sock = self._idle.pop() if self._idle else None
+        if sock is not None:
+            sock.settimeout(timeout)
+            try:
+                send_frame(sock, header, payload)
+            except OSError:
+                sock.close()
+                sock = None
+        if sock is None:
+            sock = self._connect(timeout)
+            try:
+                send_frame(sock, header, payload)
+            except OSError as e:
+                sock.close()
+                raise ModelServerError(f"Model server unavailable: {e}", retry_after=5) from e
+        try:
+            yield sock
+        except BaseException:
+            sock.close()
+            raise
+        self._release(sock)
+
+    @staticmethod
+    def _read(sock: socket.socket) -> Tuple[Dict[str, Any], bytes]:
+        try:
+            frame = recv_frame(sock)
+        except socket.timeout as e:
+            raise ModelServerError("Model server timed out", 504) from e
+        except (OSError, ValueError) as e:
+            raise ModelServerError(f"Model server connection failed: {e}", 502) from e
+        if frame is None:
+            raise ModelServerError("Model server closed the connection", 502)
+        return frame
+
+    @staticmethod
+    def _raise_for_error(header: Dict[str, Any]) -> None:
+        if "error" in header:
+            raise ModelServerError(header["error"], header.get("status", 502), header.get("retry_after"))
+
+    def call(self, op: str, payload: bytes = b"", timeout: Optional[float] = None,
+             **fields: Any) -> Tuple[Dict[str, Any], bytes]:
+        with self._exchange({"op": op, **fields}, payload, timeout or self.timeout) as sock:
+            header, data = self._read(sock)
+        self._raise_for_error(header)
+        return header, data
+
+    def stream(self, op: str, payload: bytes = b"", timeout: Optional[float] = None,
+               **fields: Any) -> Iterator[Tuple[Dict[str, Any], bytes]]:
+        """Yield response frames until the server sends ``{"end": true}`` or an error."""
+        with self._exchange({"op": op, **fields}, payload, timeout or self.timeout) as sock:
+            while True:
+                header, data = self._read(sock)
+                if header.get("end") or "error" in header:
+                    break
+                yield header, data
+        self._raise_for_error(header)
+
+    def metrics(self) -> str:
+        """The sidecar's own metrics in Prometheus text format."""
+        header, _ = self.call("metrics", timeout=10)
+        return header["text"]
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for sock in idle:
+            sock.close()
+
+
+class RemoteWhisperModel:
+    """Stands in for :class:`WhisperModelLoader` in web workers; the model lives in the sidecar."""
+
+    def __init__(self, client: ModelServerClient):
+        self.client = client
+
+    def status(self) -> Dict[str, Any]:
+        header, _ = self.client.call("status", timeout=10)
+        if header["stt"] is None:
+            raise ModelServerError("Speech-to-text is not served by this model server")
+        return header["stt"]
+
+    @property
+    def ready(self) -> bool:
+        return self.status()["ready"]
+
+
+class RemoteTranscriptionService:
+    """Same calls as :class:`TranscriptionService`, answered by the sidecar's shared queue.
+
+    ``queue_depth`` costs a round trip to the sidecar, so it is reused for
+    ``queue_depth_ttl`` seconds; live streams read it while audio arrives.
+    """
+
+    def __init__(self, client: ModelServerClient, default_timeout: float = 60.0, queue_depth_ttl: float = 0.5):
+        self.client = client
+        self.default_timeout = default_timeout
+        self.queue_depth_ttl = queue_depth_ttl
+        self._queue_depth = (0, float("-inf"))
+
+    def transcribe(self, audio: np.ndarray, timeout: Optional[float] = None, use_cache: bool = True,
+                   **options: Any) -> Dict[str, Any]:
+        timeout = self.default_timeout if timeout is None else timeout
+        header, _ = self.client.call(
+            "transcribe",
+            np.ascontiguousarray(audio, dtype=np.float32).tobytes(),
+            # Queueing and deadlines are enforced by the sidecar; the socket
+            # timeout only covers a sidecar that stopped answering.
+            timeout=timeout + 5,
+            timeout_seconds=timeout,
+            use_cache=use_cache,
+            options=options
+        )
+        return header["result"]
+
+    def warm_up(self) -> None:
+        self.client.call("warmup", timeout=10)
+
+    def stats(self) -> Dict[str, Any]:
+        header, _ = self.client.call("status", timeout=10)
+        return {**(header["transcription"] or {}), "model_server": self.client.socket_path}
+
+    @property
+    def queue_depth(self) -> int:
+        depth, read_at = self._queue_depth
+        now = time.monotonic()
+        if now - read_at >= self.queue_depth_ttl:
+            depth = self.stats().get("queue_depth", 0)
+            self._queue_depth = (depth, now)
+        return depth
+
+
+class RemoteSpeechPipeline:
+    """Callable like ``KPipeline``: yields ``(text, params, audio)`` per segment as the sidecar produces them."""
+
+    def __init__(self, client: ModelServerClient, sample_rate: int = 24000):
+        self.client = client
+        self.sample_rate = sample_rate
+
+    def __call__(self, text: str, voice: Optional[str] = None, speed: float = 1) -> Iterator[Tuple[str, str, np.ndarray]]:
+        for header, data in self.client.stream("synthesize", text=text, voice=voice, speed=speed):
+            audio = np.frombuffer(data, dtype=np.float32)
+            yield header["segment"], "params", resample(audio, header["sample_rate"], self.sample_rate)
@@ -0,0 +1,53 @@
+"""Incremental WAV encoding for streamed speech."""
+
+import struct
+from typing import Iterable, Iterator
+
+import numpy as np
+
+# RIFF and data sizes are unknown while streaming; players treat the maximum
+# value as "read until the connection closes".
+_UNKNOWN_SIZE = 0xFFFFFFFF
+WAV_HEADER_SIZE = 44
+
+
+def wav_header(sample_rate: int, channels: int = 1, bits_per_sample: int = 16) -> bytes:
+    block_align = channels * bits_per_sample // 8
+    return b"".join((
+        b"RIFF",
+        struct.pack("<I", _UNKNOWN_SIZE),
+        b"WAVE",
+        b"fmt ",
+        struct.pack("<IHHIIHH", 16, 1, channels, sample_rate, sample_rate * block_align, block_align, bits_per_sample),
+        b"data",
+        struct.pack("<I", _UNKNOWN_SIZE)
+    ))
+
+
+def patch_wav_sizes(f) -> None:
+    """Replace the unknown sizes in a :func:`wav_header` with the real ones.
+
+    ``f`` is a seekable binary file holding a complete streamed WAV file.
+    """
+    size = f.seek(0, 2)
+    f.seek(4)
+    f.write(struct.pack("<I", size - 8))
+    f.seek(WAV_HEADER_SIZE - 4)
+    f.write(struct.pack("<I", size - WAV_HEADER_SIZE))
+    f.seek(size)
+
+
+def to_pcm16(audio: np.ndarray) -> bytes:
+    """Convert float samples in [-1, 1] to little-endian 16-bit PCM, downmixing to mono."""
+    audio = np.asarray(audio, dtype=np.float32)
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+def iter_wav_stream(segments: Iterable[np.ndarray], sample_rate: int) -> Iterator[bytes]:
+    """Yield a streaming WAV header followed by PCM frames for each segment."""
+    yield wav_header(sample_rate)
+    for audio in segments:
+        if len(audio):
+            yield to_pcm16(audio)
@@ -0,0 +1,96 @@
+"""Transcription results cached by the content of the decoded audio."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from metrics import SPEECH_CACHE_HITS, SPEECH_CACHE_MISSES
+
+
+def transcript_key(audio: np.ndarray, model_name: str, options: Dict[str, Any]) -> str:
+    """Hash of the 16 kHz float32 samples, the model and the decoding options.
+
+    Hashing decoded PCM rather than upload bytes means the same recording
+    sent as WAV or FLAC, or with different metadata, still hits.
+    """
+    digest = hashlib.sha256(np.ascontiguousarray(audio, dtype=np.float32).tobytes())
+    digest.update(json.dumps([model_name, sorted(options.items())], default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class TranscriptCache:
+    """SQLite table of recent transcription results, shared by all worker processes.
+
+    Bounded to ``max_entries`` rows; the least recently used rows are removed
+    in batches once the table grows past the limit.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._puts = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS transcripts ("
+                "key TEXT PRIMARY KEY, result TEXT NOT NULL, used_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS transcripts_used_at ON transcripts (used_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT result FROM transcripts WHERE key = ?", (key,)).fetchone()
+            if row:
+                conn.execute("UPDATE transcripts SET used_at = ? WHERE key = ?", (time.time(), key))
+        with self._lock:
+            if row:
+                self.hits += 1
+            else:
+                self.misses += 1
+        (SPEECH_CACHE_HITS if row else SPEECH_CACHE_MISSES).inc(cache="transcript")
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO transcripts VALUES (?, ?, ?)",
+                (key, json.dumps(result, default=str), time.time())
+            )
+        with self._lock:
+            self._puts += 1
+            check = self._puts % 100 == 0
+        if check:
+            self._evict()
+
+    def _evict(self) -> None:
+        with closing(self._connect()) as conn, conn:
+            count = conn.execute("SELECT COUNT(*) FROM transcripts").fetchone()[0]
+            excess = count - int(self.max_entries * 0.9)
+            if count > self.max_entries and excess > 0:
+                conn.execute(
+                    "DELETE FROM transcripts WHERE key IN "
+                    "(SELECT key FROM transcripts ORDER BY used_at LIMIT ?)",
+                    (excess,)
+                )
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None
+        }
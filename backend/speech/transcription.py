@@ -0,0 +1,300 @@
+"""Queued, micro-batched transcription in front of a single Whisper model.
+
+Requests carry their audio in memory as 16 kHz float32 arrays. One inference
+thread owns the model: it takes the oldest request, waits ``batch_window``
+seconds for more to arrive, and decodes clips of up to 30 seconds together in
+one forward pass. Longer clips, and requests for word timestamps, go through
+``model.transcribe`` one at a time.
+
+Short clips are decoded the batched way (``whisper.decode`` without
+timestamps or temperature fallback) even when they run alone, so the text
+for a clip does not depend on how busy the server was when it arrived;
+that is also what makes caching it by audio hash sound.
+
+The queue is bounded, and a request is rejected up front when the expected
+wait (queue depth times the recent per-request inference time) would already
+exceed its deadline, rather than timing out after occupying a slot.
+
+With a :class:`TranscriptCache`, audio that was already transcribed with the
+same model and options is answered from the cache, and identical requests
+that arrive while the first is still running share its result.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Deque, Dict, List, Optional
+
+import numpy as np
+
+from metrics import STT_AUDIO_SECONDS, STT_BATCH_SIZE, STT_REAL_TIME_FACTOR
+
+from .transcript_cache import TranscriptCache, transcript_key
+from .whisper_loader import WHISPER_SAMPLE_RATE, WhisperModelLoader
+
+# Whisper decodes fixed 30 second windows; shorter clips can share a batch.
+BATCHABLE_SECONDS = 30
+
+
+class TranscriptionRejected(Exception):
+    def __init__(self, message: str, status: int = 503, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class _InFlight:
+    """A queued transcription shared by every caller waiting for the same audio."""
+
+    __slots__ = ("key", "future", "waiters")
+
+    def __init__(self, key: str, future: Future):
+        self.key = key
+        self.future = future
+        self.waiters = 1
+
+
+class _Request:
+    __slots__ = ("audio", "options", "deadline", "future", "enqueued_at")
+
+    def __init__(self, audio: np.ndarray, options: Dict[str, Any], deadline: float):
+        self.audio = audio
+        self.options = options
+        self.deadline = deadline
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+    @property
+    def batchable(self) -> bool:
+        return len(self.audio) <= BATCHABLE_SECONDS * WHISPER_SAMPLE_RATE and not self.options.get("word_timestamps")
+
+    @property
+    def batch_key(self):
+        return tuple(sorted(self.options.items()))
+
+
+class TranscriptionService:
+    def __init__(
+        self,
+        loader: WhisperModelLoader,
+        max_queue: int = 16,
+        max_batch: int = 8,
+        batch_window: float = 0.025,
+        default_timeout: float = 60.0,
+        cache: Optional[TranscriptCache] = None
+    ):
+        self.loader = loader
+        self.cache = cache
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.default_timeout = default_timeout
+        self.completed = 0
+        self.rejected = 0
+        self.batches = 0
+        self.deduplicated = 0
+        # Exponentially weighted seconds of inference per request.
+        self._seconds_per_request = None
+        self._queue: Deque[_Request] = deque()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._in_flight: Dict[str, _InFlight] = {}
+        self._in_flight_lock = threading.Lock()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def estimated_wait(self) -> float:
+        per_request = self._seconds_per_request
+        if per_request is None:
+            return 0.0
+        return (len(self._queue) + 1) * per_request
+
+    def submit(self, audio: np.ndarray, timeout: Optional[float] = None, **options: Any) -> Future:
+        """Queue 16 kHz mono float32 ``audio``; the future resolves to Whisper's result dict."""
+        timeout = self.default_timeout if timeout is None else timeout
+        request = _Request(np.asarray(audio, dtype=np.float32), options, time.monotonic() + timeout)
+        with self._condition:
+            if len(self._queue) >= self.max_queue:
+                self.rejected += 1
+                raise TranscriptionRejected("Transcription queue is full", retry_after=self.estimated_wait())
+            wait = self.estimated_wait()
+            if wait > timeout:
+                self.rejected += 1
+                raise TranscriptionRejected("Transcription would not finish before the deadline", retry_after=wait)
+            self._queue.append(request)
+            self._ensure_thread()
+            self._condition.notify()
+        return request.future
+
+    def warm_up(self) -> Future:
+        """Queue a second of silence so the model is loaded and exercised off the request path."""
+        return self.submit(np.zeros(WHISPER_SAMPLE_RATE, dtype=np.float32), timeout=600, language="en")
+
+    def transcribe(self, audio: np.ndarray, timeout: Optional[float] = None, use_cache: bool = True,
+                   **options: Any) -> Dict[str, Any]:
+        timeout = self.default_timeout if timeout is None else timeout
+        shared = None
+        if self.cache is None or not use_cache:
+            future = self.submit(audio, timeout=timeout, **options)
+        else:
+            key = transcript_key(audio, self.loader.model_id, options)
+            try:
+                cached = self.cache.get(key)
+            except Exception:
+                cached = None
+            if cached is not None:
+                return cached
+            shared = self._submit_once(key, audio, timeout, options)
+            future = shared.future
+        # The worker fails expired requests itself; the extra second only
+        # covers a batch that was already running when the deadline passed.
+        try:
+            return future.result(timeout=timeout + 1)
+        except FutureTimeout:
+            # A deduplicated future is only cancelled once nobody else waits on it.
+            if self._leave(shared):
+                future.cancel()
+            raise TranscriptionRejected("Transcription timed out", 504)
+
+    def _submit_once(self, key: str, audio: np.ndarray, timeout: float, options: Dict[str, Any]) -> _InFlight:
+        with self._in_flight_lock:
+            shared = self._in_flight.get(key)
+            if shared is not None:
+                self.deduplicated += 1
+                shared.waiters += 1
+                return shared
+            future = self.submit(audio, timeout=timeout, **options)
+            shared = self._in_flight[key] = _InFlight(key, future)
+
+        def done(finished: Future) -> None:
+            # Cache first: until the entry leaves _in_flight, new callers
+            # still get this (finished) future instead of missing the cache.
+            if not finished.cancelled() and finished.exception() is None:
+                try:
+                    self.cache.put(key, finished.result())
+                except Exception:
+                    pass
+            with self._in_flight_lock:
+                if self._in_flight.get(key) is shared:
+                    del self._in_flight[key]
+
+        future.add_done_callback(done)
+        return shared
+
+    def _leave(self, shared: Optional[_InFlight]) -> bool:
+        """Drop a waiter that gave up on ``shared``; True if it was the last one.
+
+        Finished futures leave ``_in_flight`` from their done callback, after
+        the result is cached.
+        """
+        if shared is None:
+            return True
+        with self._in_flight_lock:
+            shared.waiters -= 1
+            if shared.waiters:
+                return False
+            # New callers must not join a future that is about to be cancelled.
+            if self._in_flight.get(shared.key) is shared:
+                del self._in_flight[shared.key]
+            return True
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="transcription", daemon=True)
+            self._thread.start()
+
+    def _next_batch(self) -> List[_Request]:
+        with self._condition:
+            while not self._queue:
+                self._condition.wait()
+            first = self._queue.popleft()
+            batch = [first]
+            if not first.batchable:
+                return batch
+            window_ends = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch:
+                match = next(
+                    (r for r in self._queue if r.batchable and r.batch_key == first.batch_key),
+                    None
+                )
+                if match is not None:
+                    self._queue.remove(match)
+                    batch.append(match)
+                    continue
+                remaining = window_ends - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            now = time.monotonic()
+            live = []
+            for request in batch:
+                if request.future.set_running_or_notify_cancel() is False:
+                    continue
+                if request.deadline < now:
+                    self.rejected += 1
+                    request.future.set_exception(TranscriptionRejected("Deadline passed while queued", 504))
+                else:
+                    live.append(request)
+            if not live:
+                continue
+            started = time.perf_counter()
+            try:
+                if live[0].batchable:
+                    results = self._decode_batch(live)
+                else:
+                    results = [self.loader.transcribe(live[0].audio, **live[0].options)]
+            except Exception as e:
+                for request in live:
+                    request.future.set_exception(e)
+                continue
+            batch_seconds = time.perf_counter() - started
+            audio_seconds = sum(len(request.audio) for request in live) / WHISPER_SAMPLE_RATE
+            STT_AUDIO_SECONDS.inc(audio_seconds)
+            STT_BATCH_SIZE.observe(len(live))
+            if audio_seconds:
+                STT_REAL_TIME_FACTOR.observe(batch_seconds / audio_seconds)
+            elapsed = batch_seconds / len(live)
+            self._seconds_per_request = elapsed if self._seconds_per_request is None else (
+                0.8 * self._seconds_per_request + 0.2 * elapsed
+            )
+            self.batches += 1
+            self.completed += len(live)
+            for request, result in zip(live, results):
+                request.future.set_result(result)
+
+    def _decode_batch(self, batch: List[_Request]) -> List[Dict[str, Any]]:
+        import torch
+        import whisper
+
+        model = self.loader.get()
+        options = dict(batch[0].options)
+        options.setdefault("fp16", self.loader.fp16)
+        mel = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(request.audio), model.dims.n_mels)
+            for request in batch
+        ]).to(model.device)
+        decoding = whisper.DecodingOptions(without_timestamps=True, **options)
+        with torch.inference_mode():
+            results = whisper.decode(model, mel, decoding)
+        self.loader.warm = True
+        return [{"text": result.text, "language": result.language, "segments": []} for result in results]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": len(self._queue),
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "deduplicated": self.deduplicated,
+            "seconds_per_request": self._seconds_per_request,
+            "cache": self.cache.stats() if self.cache is not None else None
+        }
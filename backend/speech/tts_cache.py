@@ -0,0 +1,105 @@
+"""Disk-backed cache of synthesized speech segments."""
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import unicodedata
+from typing import Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+
+from metrics import SPEECH_CACHE_HITS, SPEECH_CACHE_MISSES
+
+
+def segment_key(text: str, voice: Optional[str], speed: float, lang_code: str) -> str:
+    """Hash of the normalized segment text and every setting that changes the audio."""
+    normalized = " ".join(unicodedata.normalize("NFKC", text).split())
+    payload = json.dumps([normalized, voice, float(speed), lang_code], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SegmentAudioCache:
+    """LRU-bounded store of segment audio as 16-bit FLAC files.
+
+    Recency is tracked through file mtimes so several worker processes can
+    share one directory. The total size is tracked in memory and the
+    directory is only rescanned when it looks over budget.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._total = sum(size for _, size, _ in self._entries())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.flac")
+
+    def _entries(self):
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".flac"):
+                    stat = entry.stat()
+                    yield stat.st_mtime, stat.st_size, entry.path
+
+    def get(self, key: str) -> Optional[Tuple[np.ndarray, int]]:
+        path = self._path(key)
+        try:
+            audio, sample_rate = sf.read(path, dtype="float32")
+            os.utime(path)
+        except Exception:
+            with self._lock:
+                self.misses += 1
+            SPEECH_CACHE_MISSES.inc(cache="tts")
+            return None
+        with self._lock:
+            self.hits += 1
+        SPEECH_CACHE_HITS.inc(cache="tts")
+        return audio, sample_rate
+
+    def put(self, key: str, audio: np.ndarray, sample_rate: int) -> None:
+        buffer = io.BytesIO()
+        sf.write(buffer, np.asarray(audio), sample_rate, format="FLAC", subtype="PCM_16")
+        data = buffer.getvalue()
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            self._total += len(data)
+            over_budget = self._total > self.max_bytes
+        if over_budget:
+            self._evict()
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        with self._lock:
+            self._total = total
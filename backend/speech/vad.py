@@ -0,0 +1,113 @@
+"""Lightweight energy-based voice activity detection for streamed audio."""
+
+from typing import List, Optional
+
+import numpy as np
+
+
+class EnergyVAD:
+    """Split a live mono float32 stream into speech segments.
+
+    Each ``frame_ms`` frame counts as speech when its RMS energy is well above
+    an adaptive noise floor (``threshold_ratio``) and above ``min_energy``.
+    A segment opens after ``min_speech_ms`` of speech, starting
+    ``pre_roll_ms`` early so the first syllable isn't clipped. It closes
+    after ``min_silence_ms`` of silence or once it reaches
+    ``max_segment_seconds``. Cost is one RMS per frame, which is negligible
+    next to the transcription itself.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: int = 30,
+        threshold_ratio: float = 3.0,
+        min_energy: float = 0.004,
+        min_speech_ms: int = 150,
+        min_silence_ms: int = 600,
+        max_segment_seconds: float = 15.0,
+        pre_roll_ms: int = 200
+    ):
+        self.sample_rate = sample_rate
+        self.frame_size = sample_rate * frame_ms // 1000
+        self.threshold_ratio = threshold_ratio
+        self.min_energy = min_energy
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.min_silence_frames = max(1, min_silence_ms // frame_ms)
+        self.max_segment_frames = int(max_segment_seconds * 1000 // frame_ms)
+        self.pre_roll_frames = pre_roll_ms // frame_ms
+        self.noise_floor = None
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self._recent: List[np.ndarray] = []
+        self._segment: List[np.ndarray] = []
+        self._in_speech = False
+        self._speech_run = 0
+        self._silence_run = 0
+
+    @property
+    def in_speech(self) -> bool:
+        return self._in_speech
+
+    def _is_speech(self, frame: np.ndarray) -> bool:
+        energy = float(np.sqrt(np.mean(frame * frame)))
+        if self.noise_floor is None:
+            # Don't let a stream that opens mid-word set the floor to speech level.
+            self.noise_floor = min(energy, self.min_energy)
+        speech = energy > max(self.min_energy, self.noise_floor * self.threshold_ratio)
+        if not speech:
+            # Track the background level slowly so a pause doesn't raise it much.
+            self.noise_floor = 0.95 * self.noise_floor + 0.05 * energy
+        return speech
+
+    def feed(self, samples: np.ndarray) -> List[np.ndarray]:
+        """Consume new samples and return any segments that just finished."""
+        samples = np.concatenate((self._remainder, np.asarray(samples, dtype=np.float32)))
+        usable = len(samples) - len(samples) % self.frame_size
+        self._remainder = samples[usable:]
+        finished = []
+        for start in range(0, usable, self.frame_size):
+            frame = samples[start:start + self.frame_size]
+            speech = self._is_speech(frame)
+            if not self._in_speech:
+                self._recent.append(frame)
+                self._speech_run = self._speech_run + 1 if speech else 0
+                if self._speech_run >= self.min_speech_frames:
+                    keep = self.min_speech_frames + self.pre_roll_frames
+                    self._segment = self._recent[-keep:]
+                    self._recent = []
+                    self._in_speech = True
+                    self._silence_run = 0
+                else:
+                    del self._recent[:-(self.min_speech_frames + self.pre_roll_frames)]
+                continue
+            self._segment.append(frame)
+            self._silence_run = 0 if speech else self._silence_run + 1
+            if self._silence_run >= self.min_silence_frames or len(self._segment) >= self.max_segment_frames:
+                finished.append(self._close())
+        return finished
+
+    def _close(self) -> np.ndarray:
+        # Drop most of the trailing silence but keep a short tail.
+        trailing = max(0, self._silence_run - self.pre_roll_frames)
+        frames = self._segment[:len(self._segment) - trailing] if trailing else self._segment
+        segment = np.concatenate(frames)
+        self._segment = []
+        self._in_speech = False
+        self._speech_run = 0
+        self._silence_run = 0
+        return segment
+
+    def current(self) -> Optional[np.ndarray]:
+        """Audio of the segment still in progress, for partial results."""
+        if not self._in_speech or not self._segment:
+            return None
+        return np.concatenate(self._segment)
+
+    def flush(self) -> Optional[np.ndarray]:
+        """End of stream: return the unfinished segment, if any."""
+        if self._in_speech and self._segment:
+            if len(self._remainder):
+                self._segment.append(self._remainder)
+            self._remainder = np.zeros(0, dtype=np.float32)
+            return self._close()
+        return None
@@ -0,0 +1,156 @@
+"""Lazy, thread-safe loading of the Whisper speech-to-text model.
+
+Neither ``torch`` nor ``whisper`` is imported until the model is first
+needed, so processes that never transcribe don't pay for either.
+
+:meth:`WhisperModelLoader.cpu_profile` builds a loader tuned for CPU-only
+servers: linear layers dynamically quantized to int8, and intra-op threads
+split between the gunicorn workers so they don't oversubscribe the cores.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+WHISPER_SAMPLE_RATE = 16000
+
+
+class WhisperModelLoader:
+    def __init__(
+        self,
+        model_name: str = "base",
+        device: Optional[str] = None,
+        threads: Optional[int] = None,
+        download_root: Optional[str] = None,
+        interop_threads: Optional[int] = None,
+        quantize: bool = False
+    ):
+        self.model_name = model_name
+        self.device = "cpu" if quantize else device
+        self.threads = threads
+        self.interop_threads = interop_threads
+        self.quantize = quantize
+        self.download_root = download_root
+        self.load_seconds = None
+        self.error = None
+        self.warm = False
+        self._model = None
+        self._loading = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def cpu_profile(cls, model_name: str = "base", workers: Optional[int] = None, **kwargs: Any) -> "WhisperModelLoader":
+        """A CPU loader with int8 linear layers and cores shared among ``workers`` processes.
+
+        ``workers`` defaults to gunicorn's ``WEB_CONCURRENCY``.
+        """
+        workers = workers or int(os.getenv("WEB_CONCURRENCY", "1"))
+        kwargs.setdefault("threads", max(1, (os.cpu_count() or 1) // max(1, workers)))
+        kwargs.setdefault("interop_threads", 1)
+        kwargs.setdefault("quantize", True)
+        return cls(model_name=model_name, device="cpu", **kwargs)
+
+    @property
+    def model_id(self) -> str:
+        """Identifies the weights actually used, for keying cached results."""
+        return f"{self.model_name}-int8" if self.quantize else self.model_name
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def ready(self) -> bool:
+        return self._model is not None and self.warm
+
+    @property
+    def fp16(self) -> bool:
+        return self.device not in (None, "cpu")
+
+    def get(self):
+        """Return the model, loading it on the first call.
+
+        Concurrent first callers wait for one load instead of each starting
+        their own.
+        """
+        model = self._model
+        if model is not None:
+            return model
+        with self._lock:
+            if self._model is None:
+                self._loading = True
+                started = time.perf_counter()
+                try:
+                    self._model = self._load()
+                    self.error = None
+                except Exception as e:
+                    self.error = str(e)
+                    raise
+                finally:
+                    self._loading = False
+                self.load_seconds = time.perf_counter() - started
+            return self._model
+
+    def _load(self):
+        import torch
+        import whisper
+
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        if self.interop_threads:
+            try:
+                torch.set_num_interop_threads(self.interop_threads)
+            except RuntimeError:
+                # Only allowed before the first parallel op in the process.
+                pass
+        if self.device is None:
+            self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        model = whisper.load_model(self.model_name, device=self.device, download_root=self.download_root)
+        model.eval()
+        if self.quantize:
+            model = self._quantize(model)
+        return model
+
+    @staticmethod
+    def _quantize(model):
+        import torch
+
+        # whisper.model.Linear only overrides forward() to cast weights to the
+        # input dtype, a no-op in fp32. quantize_dynamic matches exact types,
+        # so present those layers as plain nn.Linear to get them converted.
+        for module in model.modules():
+            if isinstance(module, torch.nn.Linear):
+                module.__class__ = torch.nn.Linear
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def transcribe(self, audio: Any, **options: Any) -> Dict[str, Any]:
+        import torch
+
+        options.setdefault("fp16", self.fp16)
+        model = self.get()
+        with torch.inference_mode():
+            result = model.transcribe(audio, **options)
+        self.warm = True
+        return result
+
+    def warm_up(self) -> None:
+        """Load the model and run one short inference so the first request is fast."""
+        self.transcribe(np.zeros(WHISPER_SAMPLE_RATE, dtype=np.float32), language="en")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "device": self.device,
+            "threads": self.threads,
+            "interop_threads": self.interop_threads,
+            "quantized": self.quantize,
+            "loaded": self.loaded,
+            "loading": self._loading,
+            "warm": self.warm,
+            "ready": self.ready,
+            "load_seconds": self.load_seconds,
+            "error": self.error
+        }
@@ -0,0 +1,101 @@
+"""Lazily initialized heavy subsystems that can be switched off by configuration.
+
+Each provider is a zero-argument function registered under a subsystem
+group (``stt``, ``tts``, ``pdf``, ``llm``). Its result is built on first
+access, so the imports it needs (torch, whisper, gTTS, pdfplumber, the LLM
+SDKs, ...) only happen in processes that use them. Accessing anything in a
+disabled group raises :class:`SubsystemDisabled`.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+SUBSYSTEMS = ("stt", "tts", "pdf", "llm")
+
+
+class SubsystemDisabled(Exception):
+    def __init__(self, subsystem: str):
+        super().__init__(f"The {subsystem} subsystem is disabled on this server")
+        self.subsystem = subsystem
+        self.status = 503
+
+
+def parse_subsystem_list(value: Optional[str]) -> set:
+    names = {name.strip().lower() for name in (value or "").split(",") if name.strip()}
+    unknown = names - set(SUBSYSTEMS)
+    if unknown:
+        raise ValueError(f"Unknown subsystems: {', '.join(sorted(unknown))}")
+    return names
+
+
+class Subsystems:
+    def __init__(self, disabled: Iterable[str] = ()):
+        self.disabled = set(disabled)
+        self.init_seconds: Dict[str, float] = {}
+        self._providers: Dict[str, tuple] = {}
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def provider(self, subsystem: str, name: str) -> Callable[[Callable[[], Any]], Callable[[], Any]]:
+        """Decorator registering a factory whose result is then available as ``self.<name>``."""
+        if subsystem not in SUBSYSTEMS:
+            raise ValueError(f"Unknown subsystem: {subsystem}")
+
+        def register(factory: Callable[[], Any]) -> Callable[[], Any]:
+            self._providers[name] = (subsystem, factory)
+            return factory
+
+        return register
+
+    def configure(self, disabled: Iterable[str] = ()) -> None:
+        self.disabled = set(disabled)
+
+    def enabled(self, subsystem: str) -> bool:
+        return subsystem not in self.disabled
+
+    def require(self, subsystem: str) -> None:
+        if subsystem in self.disabled:
+            raise SubsystemDisabled(subsystem)
+
+    def get(self, name: str) -> Any:
+        subsystem, factory = self._providers[name]
+        self.require(subsystem)
+        try:
+            return self._instances[name]
+        except KeyError:
+            pass
+        # Reentrant so a provider can depend on another one.
+        with self._lock:
+            if name not in self._instances:
+                started = time.perf_counter()
+                self._instances[name] = factory()
+                self.init_seconds[name] = time.perf_counter() - started
+            return self._instances[name]
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_") or name not in self._providers:
+            raise AttributeError(name)
+        return self.get(name)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._instances
+
+    def preload(self, subsystems: Iterable[str]) -> None:
+        """Build every enabled provider in ``subsystems`` now instead of on first use."""
+        wanted = set(subsystems)
+        for name, (subsystem, _) in list(self._providers.items()):
+            if subsystem in wanted and self.enabled(subsystem):
+                self.get(name)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            subsystem: {
+                "enabled": self.enabled(subsystem),
+                "loaded": {
+                    name: round(self.init_seconds[name], 3) if name in self._instances else None
+                    for name, (group, _) in self._providers.items() if group == subsystem
+                }
+            }
+            for subsystem in SUBSYSTEMS
+        }
@@ -0,0 +1,30 @@
+import numpy as np
+
+from speech.transcript_cache import TranscriptCache
+from speech.transcription import BATCHABLE_SECONDS, TranscriptionService
+from speech.whisper_loader import WHISPER_SAMPLE_RATE
+
+
+class FakeLoader:
+    model_id = "fake"
+    fp16 = False
+    warm = True
+
+    def __init__(self):
+        self.calls = 0
+
+    def transcribe(self, audio, **options):
+        self.calls += 1
+        return {"text": "hello", "language": "en", "segments": []}
+
+
+def test_immediate_repeat_is_answered_from_the_cache(tmp_path):
+    loader = FakeLoader()
+    service = TranscriptionService(loader, cache=TranscriptCache(str(tmp_path / "transcripts.sqlite3")))
+    # Longer than a batch window, so the fake loader's transcribe() is used.
+    audio = np.random.default_rng(0).standard_normal((BATCHABLE_SECONDS + 1) * WHISPER_SAMPLE_RATE).astype(np.float32)
+
+    for _ in range(20):
+        assert service.transcribe(audio, timeout=5)["text"] == "hello"
+
+    assert loader.calls == 1
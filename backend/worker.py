@@ -0,0 +1,9 @@
+"""Runs queued background jobs outside the web workers: python worker.py"""
+
+import os
+
+from services import job_handlers, job_store
+from jobs import JobWorkerPool
+
+if __name__ == "__main__":
+    JobWorkerPool(job_store, job_handlers, workers=int(os.getenv("JOB_WORKERS", "2"))).run_forever()